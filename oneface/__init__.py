@@ -1,6 +1,38 @@
-from .core import one
-from funcdesc import Val
+import typing as T
 
 __version__ = '0.2.2'
 
-__all__ = [one, Val]
+# public names and the modules they are defined in,
+# the modules are imported on first access(PEP 562)
+_lazy_names = {
+    "one": ".core",
+    "check_args": ".check",
+    "check_cancelled": ".job",
+    "progress": ".progress_report",
+    "report": ".progress_report",
+    "Val": "funcdesc",
+}
+
+if T.TYPE_CHECKING:
+    from .core import one
+    from .check import check_args
+    from .job import check_cancelled
+    from .progress_report import progress, report
+    from funcdesc import Val
+
+
+def __getattr__(name: str):
+    if name in _lazy_names:
+        import importlib
+        module = importlib.import_module(_lazy_names[name], __name__)
+        val = getattr(module, name)
+        globals()[name] = val
+        return val
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_names))
+
+
+__all__ = ["one", "Val", "check_cancelled", "progress", "report", "check_args"]
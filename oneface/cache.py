@@ -0,0 +1,106 @@
+import os
+import re
+import pickle
+import inspect
+import hashlib
+import typing as T
+import threading
+
+from .store import TTLStore, DiskStore
+
+
+_missing = object()
+
+
+def func_namespace(func: T.Callable) -> str:
+    """Module and qualified name of the function."""
+    func = inspect.unwrap(func)
+    module = getattr(func, "__module__", None) or ""
+    name = getattr(func, "__qualname__", None) or type(func).__qualname__
+    return f"{module}.{name}"
+
+
+def func_version(func: T.Callable) -> str:
+    """Hash of the function's code, changed when the function is edited."""
+    code = getattr(inspect.unwrap(func), "__code__", None)
+    if code is None:
+        return ""
+    content = code.co_code + repr(code.co_consts).encode()
+    return hashlib.sha256(content).hexdigest()
+
+
+class ResultCache(object):
+    """Cache the function results, keyed on the arguments.
+    Results are stored in memory, or in the `cache_dir` if it is given.
+
+    The keys also cover the `namespace` and the `version` of the function,
+    so the functions sharing a `cache_dir` do not see each other's
+    results, and the results of an edited function are not reused.
+    On disk, each namespace has it's own subdirectory."""
+
+    def __init__(
+            self, max_size: int = 128,
+            ttl: T.Optional[float] = None,
+            cache_dir: T.Optional[str] = None,
+            namespace: str = "",
+            version: str = ""):
+        self.namespace = namespace
+        self.version = version
+        self.store: T.Union[TTLStore, DiskStore]
+        if cache_dir is None:
+            self.store = TTLStore(max_size, ttl)
+        else:
+            sub_dir = re.sub(r"[^\w.-]", "_", namespace) or "_"
+            self.store = DiskStore(
+                os.path.join(cache_dir, sub_dir), max_size, ttl)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def make_key(self, pass_in: dict) -> T.Optional[str]:
+        """Hash the arguments, return None if they can not be pickled."""
+        try:
+            data = pickle.dumps(
+                (self.namespace, self.version, sorted(pass_in.items())),
+                protocol=4)
+        except Exception:
+            return None
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, key: str) -> T.Tuple[bool, T.Any]:
+        val = self.store.get(key, _missing)
+        hit = val is not _missing
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return hit, (val if hit else None)
+
+    def set(self, key: str, value: T.Any):
+        try:
+            self.store.set(key, value)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            pass  # value can not be saved to disk
+
+    def info(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.store),
+            "max_size": self.store.max_size,
+        }
+
+    def clear(self):
+        self.store.clear()
+        with self._lock:
+            self.hits = self.misses = 0
@@ -1,12 +1,18 @@
+import time
 import typing as T
+import reprlib
 import functools
 
-from rich.console import Console
-from rich.table import Table
 from funcdesc.guard import Guard, TF2, CheckError
-from funcdesc.desc import Description, Value
+from funcdesc.desc import Description, Value, NotDef
 
 from .utils import get_callable_name
+from .metrics import metrics
+
+if T.TYPE_CHECKING:
+    from rich.console import Console
+    from rich.table import Table
+    from .cache import ResultCache
 
 
 def check_args(func=None, **kwargs):
@@ -15,7 +21,103 @@ def check_args(func=None, **kwargs):
     return CallWithCheck(func, **kwargs)
 
 
-console = Console()
+_console: T.Optional["Console"] = None
+
+
+def get_console() -> "Console":
+    """The rich console, created on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+def __getattr__(name: str):
+    if name == "console":
+        return get_console()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_repr = reprlib.Repr()
+_repr.maxstring = _repr.maxother = 60
+
+
+def short_str(val: T.Any, max_len: int = 60) -> str:
+    """String of the value for printing, large values are truncated."""
+    if isinstance(val, (str, int, float, bool)) or (val is None):
+        s = str(val)
+    else:
+        s = _repr.repr(val)
+    if len(s) > max_len:
+        s = s[:max_len - 3] + "..."
+    return s
+
+
+Checker = T.Callable[[T.Any], None]
+
+
+def compile_checker(
+        arg: Value, check_type: bool = True,
+        check_range: bool = True) -> T.Optional[Checker]:
+    """Compile the type and range checking of an argument to a closure.
+    The checker functions are looked up from the registry at call time,
+    so the types registered after compiling are also checked."""
+    tp = arg.type
+    if (tp is None) or not (check_type or check_range):
+        return None
+    tp_name = tp.__name__
+    get_type_checker = type(arg).type_to_type_checker.get
+    get_range_checker = type(arg).type_to_range_checker.get
+    range_ = arg.range
+
+    def check(val):
+        if check_type:
+            checker = get_type_checker(tp_name)
+            if (checker is not None) and (not checker(val, tp)):
+                raise TypeError(
+                    f"Value {val} is not in valid type({tp})")
+        if check_range:
+            checker = get_range_checker(tp_name)
+            if (checker is not None) and (not checker(val, range_)):
+                raise ValueError(
+                    f"Value {val} is not in a valid range({range_}).")
+
+    return check
+
+
+class CheckPlan(object):
+    """Checkers and table row templates compiled from the inputs
+    description, built once and reused for every call."""
+
+    def __init__(
+            self, inputs: T.List[Value],
+            check_type: bool = True, check_range: bool = True):
+        self.names = [a.name for a in inputs]
+        self.defaults = [(a.name, a.default) for a in inputs]
+        # number of leading arguments without default value
+        self.n_required = max(
+            [i + 1 for i, a in enumerate(inputs) if a.default is NotDef],
+            default=0)
+        self.items: T.List[T.Tuple[str, T.Optional[Checker], str, str]] = [
+            (a.name, compile_checker(a, check_type, check_range),
+             str(a.type), short_str(a.range))
+            for a in inputs
+        ]
+        self.checkers = [
+            (name, checker) for name, checker, _, _ in self.items
+            if checker is not None
+        ]
+
+    def bind(self, args: tuple, kwargs: dict) -> T.Optional[dict]:
+        """Fast path of Description.parse_pass_in, only for the calls
+        pass arguments by position. Return None for other calls."""
+        if kwargs or not (self.n_required <= len(args) <= len(self.names)):
+            return None
+        pass_in = dict(zip(self.names, args))
+        for name, default in self.defaults[len(args):]:
+            pass_in[name] = default
+        return pass_in
 
 
 class CallWithCheck(Guard[TF2]):
@@ -30,17 +132,180 @@ class CallWithCheck(Guard[TF2]):
             check_range: bool = True,
             print_args: bool = True,
             name: T.Optional[str] = None,
+            cache: bool = False,
+            cache_size: int = 128,
+            cache_ttl: T.Optional[float] = None,
+            cache_dir: T.Optional[str] = None,
+            metrics: bool = False,
             ) -> None:
         self.name = get_callable_name(func, name)
+        # record the calls to the metrics of the process
+        self.is_record_metrics = metrics
         self.is_print_args = print_args
-        self.table: T.Optional[Table] = None
+        self.table: T.Optional["Table"] = None
+        self._plan: T.Optional[CheckPlan] = None
         super().__init__(
             func, desc, check_inputs, check_outputs,
             check_side_effect, check_type, check_range,)
+        self._metrics: T.Optional[tuple] = None
+        self.cache: T.Optional["ResultCache"] = None
+        # functions with side effects should not be cached
+        if cache and (len(self.desc.side_effects) == 0):
+            from . import cache as _cache
+            self.cache = _cache.ResultCache(
+                cache_size, cache_ttl, cache_dir,
+                namespace=_cache.func_namespace(func),
+                version=_cache.func_version(func))
+
+    def __getstate__(self) -> dict:
+        # the compiled checkers and the metrics are rebuilt on demand
+        state = self.__dict__.copy()
+        state.update(_plan=None, _metrics=None, table=None)
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+
+    @property
+    def call_metrics(self) -> tuple:
+        """Counters and histograms updated by every call."""
+        if self._metrics is None:
+            names = (
+                "oneface_calls_total", "oneface_check_errors_total",
+                "oneface_cache_hits_total", "oneface_call_errors_total")
+            counters = tuple(metrics.counter(n, func=self.name) for n in names)
+            self._metrics = counters + (
+                metrics.histogram("oneface_check_seconds", func=self.name),
+                metrics.histogram("oneface_call_seconds", func=self.name),
+            )
+        return self._metrics
+
+    @property
+    def plan(self) -> CheckPlan:
+        if self._plan is None:
+            self._plan = CheckPlan(
+                self.desc.inputs, self.is_check_type, self.is_check_range)
+        return self._plan
+
+    def __get__(self, obj, objtype):
+        is_bounded = hasattr(self, "_bounded")
+        super().__get__(obj, objtype)
+        if not is_bounded:  # the first input is removed when bound
+            self._plan = None
+        return self
+
+    def parse_pass_in(self, args: tuple, kwargs: dict) -> dict:
+        pass_in = self.plan.bind(args, kwargs)
+        if pass_in is None:
+            pass_in = self.desc.parse_pass_in(args, kwargs)
+        return pass_in
+
+    def __call__(self, *args, **kwargs):
+        if self.is_check_side_effect:
+            return super().__call__(*args, **kwargs)
+        if self.is_record_metrics:
+            return self._call_with_metrics(args, kwargs)
+        # the hot path of the library functions, kept inline
+        pass_in = None
+        if self.is_check_inputs or (self.cache is not None):
+            pass_in = self.parse_pass_in(args, kwargs)
+        if self.is_check_inputs:
+            self.check_inputs(pass_in, [])
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(pass_in)
+            if key is not None:
+                hit, res = self.cache.get(key)
+                if hit:
+                    return res
+        return self._after_call(self.func(*args, **kwargs), key)
+
+    def _before_call(
+            self, args: tuple, kwargs: dict
+            ) -> T.Tuple[bool, T.Any, T.Optional[str]]:
+        """Check the arguments and look up the cache.
+        Return whether the cache is hit, the cached result and the key."""
+        pass_in = None
+        if self.is_check_inputs or (self.cache is not None):
+            pass_in = self.parse_pass_in(args, kwargs)
+        if self.is_check_inputs:
+            self.check_inputs(pass_in, [])
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(pass_in)
+            if key is not None:
+                hit, res = self.cache.get(key)
+                if hit:
+                    return True, res, key
+        return False, None, key
+
+    def _after_call(self, res: T.Any, key: T.Optional[str]) -> T.Any:
+        if self.is_check_outputs:
+            self.check_outputs(res, [])
+        if key is not None:
+            self.cache.set(key, res)
+        return res
+
+    def _call_with_metrics(self, args: tuple, kwargs: dict):
+        calls, check_errors, cache_hits, call_errors, check_time, \
+            call_time = self.call_metrics
+        calls.inc()
+        t0 = time.perf_counter()
+        try:
+            hit, res, key = self._before_call(args, kwargs)
+        except (CheckError, TypeError):
+            check_errors.inc()
+            raise
+        if hit:
+            cache_hits.inc()
+            return res
+        t1 = time.perf_counter()
+        check_time.observe(t1 - t0)
+        try:
+            res = self.func(*args, **kwargs)
+        except Exception:
+            call_errors.inc()
+            raise
+        finally:
+            call_time.observe(time.perf_counter() - t1)
+        return self._after_call(res, key)
+
+    def check_batch(
+            self, calls: T.Iterable[T.Tuple[tuple, dict]]
+            ) -> T.List[T.Tuple[T.Optional[dict], T.Optional[Exception]]]:
+        """Check the arguments of many calls without printing.
+        Return the parsed arguments and the error of each call."""
+        checkers = self.plan.checkers if self.is_check_inputs else []
+        res = []
+        for args, kwargs in calls:
+            try:
+                pass_in = self.parse_pass_in(args, kwargs)
+            except TypeError as e:
+                res.append((None, e))
+                continue
+            errors = []
+            for name, checker in checkers:
+                try:
+                    checker(pass_in[name])
+                except (TypeError, ValueError) as e:
+                    errors.append(e)
+            if errors:
+                res.append((pass_in, CheckError(errors)))
+            else:
+                res.append((pass_in, None))
+        return res
+
+    def cache_info(self) -> T.Optional[dict]:
+        return None if self.cache is None else self.cache.info()
+
+    def cache_clear(self):
+        if self.cache is not None:
+            self.cache.clear()
 
     def print_args(self):
         if self.table is None:
             return
+        console = get_console()
         if self.name:
             console.print(f"Run: [bold purple]{self.name}")
         console.print("Arguments table:\n")
@@ -52,10 +317,7 @@ class CallWithCheck(Guard[TF2]):
             arg: Value,
             val: T.Any,
             errors: T.List[Exception]):
-        val_str = str(val)
-        range_str = str(arg.range)
-        tp_str = str(type(val))
-        ann_tp_str = str(arg.type)
+        error = None
         try:
             if self.is_check_type:
                 arg.check_type(val)
@@ -63,30 +325,57 @@ class CallWithCheck(Guard[TF2]):
                 arg.check_range(val)
         except Exception as e:
             errors.append(e)
-            if isinstance(e, ValueError):
-                val_str = f"[red]{val_str}[/red]"
-                range_str = f"[red]{range_str}[/red]"
-            elif isinstance(e, TypeError):
-                ann_tp_str = f"[red]{ann_tp_str}[/red]"
-                tp_str = f"[red]{tp_str}[/red]"
-            else:
+            if not isinstance(e, (ValueError, TypeError)):
                 raise e
+            error = e
         if self.is_print_args:
-            self.table.add_row(
-                arg.name, ann_tp_str, range_str, val_str, tp_str)
+            self.add_table_row(
+                arg.name, str(arg.type), short_str(arg.range), val, error)
+
+    def add_table_row(
+            self, name: str, ann_tp_str: str, range_str: str,
+            val: T.Any, error: T.Optional[Exception] = None):
+        val_str = short_str(val)
+        tp_str = str(type(val))
+        if isinstance(error, ValueError):
+            val_str = f"[red]{val_str}[/red]"
+            range_str = f"[red]{range_str}[/red]"
+        elif isinstance(error, TypeError):
+            ann_tp_str = f"[red]{ann_tp_str}[/red]"
+            tp_str = f"[red]{tp_str}[/red]"
+        self.table.add_row(
+            name, ann_tp_str, range_str, val_str, tp_str)
 
     def check_inputs(self, pass_in: dict, errors: list):
         if self.is_print_args:
-            self.table = self.get_argument_table()
-        for val in self.desc.inputs:
-            self.check_value(val, pass_in[val.name], errors)
-        if self.is_print_args:
-            self.print_args()
+            return self.check_and_print_inputs(pass_in, errors)
+        for name, checker in self.plan.checkers:
+            try:
+                checker(pass_in[name])
+            except (TypeError, ValueError) as e:
+                errors.append(e)
+        if len(errors) > 0:
+            raise CheckError(errors)
+
+    def check_and_print_inputs(self, pass_in: dict, errors: list):
+        self.table = self.get_argument_table()
+        for name, checker, ann_tp_str, range_str in self.plan.items:
+            val = pass_in[name]
+            error = None
+            if checker is not None:
+                try:
+                    checker(val)
+                except (TypeError, ValueError) as e:
+                    errors.append(e)
+                    error = e
+            self.add_table_row(name, ann_tp_str, range_str, val, error)
+        self.print_args()
         if len(errors) > 0:
             raise CheckError(errors)
 
     @staticmethod
     def get_argument_table():
+        from rich.table import Table
         table = Table(
             show_header=True, header_style="bold magenta",
             box=None)
@@ -0,0 +1,123 @@
+import sys
+import typing as T
+import threading
+import contextlib
+from collections import deque
+from contextvars import ContextVar
+
+
+class ConsoleBuffer(object):
+    """An append-only text buffer with bounded size.
+
+    Every written char has an absolute offset, readers keep their own
+    cursor and read the new text from it. When the size exceeds
+    `max_size` chars, the oldest chunks are dropped."""
+
+    def __init__(self, max_size: int = 1000000):
+        self.max_size = max_size
+        self._chunks: T.Deque[T.Tuple[int, str]] = deque()
+        self._size = 0
+        self.start = 0  # offset of the first retained char
+        self.end = 0  # offset after the last written char
+        self._lock = threading.Lock()
+        self._new_data = threading.Condition(self._lock)
+
+    def write(self, s: str) -> int:
+        if not s:
+            return 0
+        with self._lock:
+            self._chunks.append((self.end, s))
+            self.end += len(s)
+            self._size += len(s)
+            while (self._size > self.max_size) and (len(self._chunks) > 1):
+                _, old = self._chunks.popleft()
+                self._size -= len(old)
+                self.start += len(old)
+            self._new_data.notify_all()
+        return len(s)
+
+    def wait(self, offset: int, timeout: T.Optional[float] = None) -> bool:
+        """Block until there are text after the `offset` or timeout.
+        Return whether there are new text."""
+        with self._lock:
+            return self._new_data.wait_for(
+                lambda: self.end > offset, timeout)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+    def read_from(self, offset: int) -> T.Tuple[str, int, bool]:
+        """Read the text after the `offset`.
+
+        Return the text, the new offset and whether some text
+        after the `offset` is already dropped."""
+        with self._lock:
+            if offset >= self.end:
+                return "", self.end, False
+            truncated = offset < self.start
+            parts = []
+            # walk from the newest chunk, readers are usually near the end
+            for c_start, chunk in reversed(self._chunks):
+                parts.append(chunk[max(offset - c_start, 0):])
+                if c_start <= offset:
+                    break
+            return "".join(reversed(parts)), self.end, truncated
+
+    def getvalue(self) -> str:
+        return self.read_from(0)[0]
+
+
+_capture_target: ContextVar[T.Optional[T.TextIO]] = ContextVar(
+    "oneface_capture_target", default=None)
+
+
+class StreamRouter(object):
+    """Replacement of sys.stdout/sys.stderr, route the writes to the
+    capture target of current thread/task, or to the original stream."""
+
+    def __init__(self, fallback: T.TextIO):
+        self.fallback = fallback
+
+    @property
+    def target(self) -> T.TextIO:
+        target = _capture_target.get()
+        return self.fallback if target is None else target
+
+    def write(self, s: str) -> int:
+        return self.target.write(s)
+
+    def flush(self):
+        self.target.flush()
+
+    def isatty(self) -> bool:
+        return self.target.isatty()
+
+    def __getattr__(self, name: str):
+        return getattr(self.fallback, name)
+
+
+_install_lock = threading.Lock()
+
+
+def install_router():
+    """Wrap sys.stdout and sys.stderr with StreamRouter, if not wrapped."""
+    with _install_lock:
+        if not isinstance(sys.stdout, StreamRouter):
+            sys.stdout = StreamRouter(sys.stdout)
+        if not isinstance(sys.stderr, StreamRouter):
+            sys.stderr = StreamRouter(sys.stderr)
+
+
+@contextlib.contextmanager
+def capture_output(stream: T.TextIO):
+    """Capture the stdout and stderr of current thread/task to `stream`.
+    Unlike contextlib.redirect_stdout, it does not affect other threads."""
+    install_router()
+    token = _capture_target.set(stream)
+    try:
+        yield stream
+    finally:
+        _capture_target.reset(token)
@@ -1,7 +1,12 @@
+import typing as T
 import functools
+import importlib
 
 from .check import CallWithCheck
 
+if T.TYPE_CHECKING:
+    from concurrent.futures import Executor
+
 
 def one(func=None, **kwargs):
     if func is None:
@@ -9,11 +14,51 @@ def one(func=None, **kwargs):
     return One(func, **kwargs)
 
 
+def _call(func: T.Callable, args: tuple, kwargs: dict):
+    return func(*args, **kwargs)
+
+
+def _resolve(module: str, qualname: str) -> T.Any:
+    obj = importlib.import_module(module)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _call_by_name(module: str, qualname: str, args: tuple, kwargs: dict):
+    func = _resolve(module, qualname)
+    if isinstance(func, CallWithCheck):  # the arguments are checked
+        func = func.func
+    return func(*args, **kwargs)
+
+
+def _process_call(func: T.Callable) -> T.Tuple[T.Callable, tuple]:
+    """The target and the leading arguments to call the function in
+    another process. When the module attribute of the function is it's
+    wrapper(decorated by @one), the function can not be pickled,
+    it is sent by the module and the qualified name instead."""
+    module = getattr(func, "__module__", None)
+    qualname = getattr(func, "__qualname__", None)
+    if module and qualname and ("<locals>" not in qualname):
+        try:
+            obj = _resolve(module, qualname)
+        except (ImportError, AttributeError):
+            obj = None
+        if isinstance(obj, CallWithCheck) and (obj.func is func):
+            return _call_by_name, (module, qualname)
+    return _call, (func,)
+
+
 class One(CallWithCheck):
 
     def cli(self):
         from fire import Fire
-        Fire(self.__call__)
+        from .progress_report import RichProgress
+
+        def call(*args, **kwargs):
+            with RichProgress().activate():
+                return self(*args, **kwargs)
+        Fire(call)
 
     def qt_gui(self, **kwargs):
         from .qt import GUI
@@ -22,3 +67,107 @@ class One(CallWithCheck):
     def dash_app(self, **kwargs):
         from .dash_app import App
         return App(self, **kwargs)()
+
+    def map(
+            self, iterable_of_kwargs: T.Iterable[dict],
+            workers: int = 1, backend: str = "thread",
+            stream: bool = False) -> T.Union[list, T.Iterator]:
+        """Call the function with each keyword arguments dict.
+
+        Arguments of all calls are checked at first, then the valid calls
+        are run with `workers` threads or processes(backend="process").
+        Results are returned in order, the calls failed are represented
+        by their exceptions instead of aborting the whole batch.
+        If `stream` is True, return an iterator yield the results.
+        """
+        calls = [((), kwargs) for kwargs in iterable_of_kwargs]
+        return self._batch_call(calls, workers, backend, stream)
+
+    def starmap(
+            self, iterable_of_args: T.Iterable[tuple],
+            workers: int = 1, backend: str = "thread",
+            stream: bool = False) -> T.Union[list, T.Iterator]:
+        """Like `map`, but the items are positional arguments tuples."""
+        calls = [(tuple(args), {}) for args in iterable_of_args]
+        return self._batch_call(calls, workers, backend, stream)
+
+    def _batch_call(
+            self, calls: T.List[T.Tuple[tuple, dict]],
+            workers: int, backend: str, stream: bool):
+        # check before building the iterator, a stream fails at once
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown backend: {backend}")
+        it = self._iter_batch(calls, workers, backend)
+        return it if stream else list(it)
+
+    def _iter_batch(
+            self, calls: T.List[T.Tuple[tuple, dict]],
+            workers: int, backend: str) -> T.Iterator:
+        from concurrent.futures import (
+            ThreadPoolExecutor, ProcessPoolExecutor
+        )
+        executor: T.Optional["Executor"] = None
+        target, target_args = _call, (self.func,)
+        if backend == "process":
+            executor = ProcessPoolExecutor(workers)
+            target, target_args = _process_call(self.func)
+        elif workers > 1:
+            executor = ThreadPoolExecutor(workers)
+        submit = None if executor is None else \
+            functools.partial(executor.submit, target, *target_args)
+        # items: (kind, value, cache key), kind is 'value', 'call' or 'future'
+        items: T.List[T.Tuple[str, T.Any, T.Optional[str]]] = []
+        try:
+            self._submit_batch(calls, submit, items)
+            yield from self._collect_batch(items)
+        finally:
+            if executor is not None:
+                for kind, value, _ in items:
+                    if kind == "future":
+                        value.cancel()
+                executor.shutdown(wait=False)
+
+    def _submit_batch(
+            self, calls: T.List[T.Tuple[tuple, dict]],
+            submit: T.Optional[T.Callable],
+            items: T.List[T.Tuple[str, T.Any, T.Optional[str]]]):
+        """Check the arguments and look up the cache, submit the calls
+        to the executor, or keep them to be called in order."""
+        for (args, kwargs), (pass_in, err) in zip(
+                calls, self.check_batch(calls)):
+            if err is not None:
+                items.append(("value", err, None))
+                continue
+            key = None
+            if self.cache is not None:
+                key = self.cache.make_key(pass_in)
+                if key is not None:
+                    hit, res = self.cache.get(key)
+                    if hit:
+                        items.append(("value", res, None))
+                        continue
+            if submit is None:
+                items.append(("call", (args, kwargs), key))
+            else:
+                items.append(("future", submit(args, kwargs), key))
+
+    def _collect_batch(
+            self, items: T.List[T.Tuple[str, T.Any, T.Optional[str]]]
+            ) -> T.Iterator:
+        """Yield the results in order, exceptions are yielded
+        as the results."""
+        for kind, value, key in items:
+            if kind == "value":
+                yield value
+                continue
+            try:
+                if kind == "call":
+                    res = _call(self.func, *value)
+                else:
+                    res = value.result()
+            except Exception as e:
+                yield e
+                continue
+            if key is not None:
+                self.cache.set(key, res)
+            yield res
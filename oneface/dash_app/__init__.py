@@ -2,6 +2,7 @@ import functools
 
 from .app import App
 from .embed import flask_route
+from .hub import Hub
 
 
 def app(func=None, **kwargs):
@@ -10,4 +11,4 @@ def app(func=None, **kwargs):
     return App(func, **kwargs)
 
 
-__all__ = ["app", "App", "flask_route"]
+__all__ = ["app", "App", "flask_route", "Hub"]
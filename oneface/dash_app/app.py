@@ -1,8 +1,16 @@
+import os
+import json
+import uuid
+import atexit
+import time
+import shutil
+import functools
+import tempfile
 import typing as T
-import contextlib
-from io import StringIO
+from urllib.parse import quote
 
-from dash import Dash, dcc, html, Input, Output, State
+from flask import Response, request, send_file, abort, jsonify
+from dash import Dash, dcc, html, Input, Output, State, no_update
 from dash.exceptions import PreventUpdate
 from ansi2html import Ansi2HTMLConverter
 import visdcc
@@ -10,13 +18,67 @@ from funcdesc.types import (
     OneOf, SubSet, InputPath, OutputPath
 )
 from funcdesc.desc import NotDef
-from funcdesc.parse import parse_func
 
+from .shared import SharedState, SharedSession
+from .serve import find_server, run_gunicorn, run_waitress, remove_dir
+from .result import truncate_text, downsample_figure
+from .push import SSE_CLIENT_JS, SSE_HEARTBEAT, format_sse
+from .upload import (
+    UPLOAD_CLIENT_JS, UploadTooLarge, save_stream, upload_path,
+    cleanup_uploads,
+)
 from .input_item import (
     InputItem, IntInputItem, FloatInputItem, StrInputItem, BoolInputItem,
-    DropdownInputItem, MultiDropdownInputItem,
+    DropdownInputItem, MultiDropdownInputItem, UploadInputItem,
+)
+from ..utils import (
+    AllowWrapInstanceMethod, get_callable_name, get_func_desc
 )
-from ..utils import AllowWrapInstanceMethod, get_callable_name
+from ..job import JobManager, ExecutorType
+from ..store import TTLStore
+from ..console import ConsoleBuffer
+from ..metrics import metrics
+
+
+class Session(object):
+    """Results and console output of a browser session."""
+    def __init__(self, console_max_size: int = 1000000):
+        self.console = ConsoleBuffer(console_max_size)
+        self.result: T.Optional[T.Any] = None
+        self.result_id: T.Optional[str] = None
+        self.job_id: T.Optional[str] = None
+
+
+def console_to_html(text: str, truncated: bool = False) -> str:
+    if truncated:
+        text = "[... earlier output is truncated ...]\n" + text
+    return Ansi2HTMLConverter().convert(text, full=False)
+
+
+@functools.lru_cache(maxsize=None)
+def console_src_doc() -> str:
+    """Empty html page of the console, generating the styles is slow
+    so it is built once and shared by all apps."""
+    return Ansi2HTMLConverter().convert("", full=True).replace(
+        '<pre class="ansi2html-content">',
+        '<pre class="ansi2html-content" id="console-content">')
+
+
+CONSOLE_APPEND_JS = """
+var out = document.getElementById('console-out');
+var doc = out.contentWindow.document;
+var content = doc.getElementById('console-content');
+if (content !== null) {{
+    if ({reset}) {{ content.innerHTML = ''; }}
+    var span = doc.createElement('span');
+    span.innerHTML = {html};
+    content.appendChild(span);
+    while (content.childNodes.length > {max_chunks}) {{
+        content.removeChild(content.firstChild);
+    }}
+    out.contentWindow.scrollTo(0, 999999999);
+}}
+"""
 
 
 class App(AllowWrapInstanceMethod):
@@ -27,16 +89,60 @@ class App(AllowWrapInstanceMethod):
             self, func, name=None,
             show_console=True,
             console_interval=2000,
+            console_max_size=1000000,
+            console_max_chunks=1000,
             interactive=False, init_run=False,
             result_show_type="text",
+            executor: ExecutorType = None,
+            executor_workers: T.Optional[int] = None,
+            job_poll_interval=500,
+            max_sessions=256,
+            session_ttl=3600,
+            transport="poll",
+            timeout: T.Optional[float] = None,
+            download_mode="inline",
+            upload: bool = False,
+            upload_dir: T.Optional[str] = None,
+            upload_max_size: T.Optional[int] = 100 * 1024 ** 2,
+            result_transport="store",
+            text_max_chars: T.Optional[int] = 100000,
+            plotly_max_points: T.Optional[int] = None,
+            shared_dir: T.Optional[str] = None,
+            serve: T.Union[bool, dict, None] = None,
             **server_args):
         self.func = func
         self.name = get_callable_name(func, name)
         self.show_console = show_console
         self.console_interval = console_interval
+        self.console_max_size = console_max_size
+        self.console_max_chunks = console_max_chunks
         self.interactive = interactive
         self.init_run = init_run
         self.result_show_type = result_show_type
+        if download_mode not in ("inline", "stream"):
+            raise ValueError(f"Unknown download mode: {download_mode}")
+        self.download_mode = download_mode
+        self.upload = upload
+        self.upload_dir = upload_dir
+        self.upload_max_size = upload_max_size
+        self.has_upload = False
+        if result_transport not in ("store", "server"):
+            raise ValueError(f"Unknown result transport: {result_transport}")
+        self.result_transport = result_transport
+        self.text_max_chars = text_max_chars
+        self.plotly_max_points = plotly_max_points
+        self.job_manager = JobManager(
+            executor, executor_workers, timeout=timeout,
+            labels={"interface": "dash", "app": self.name})
+        self.job_poll_interval = job_poll_interval
+        self.sessions = TTLStore(max_sessions, session_ttl)
+        self.shared: T.Optional[SharedState] = None
+        if shared_dir is not None:
+            self.use_shared_dir(shared_dir)
+        self.serve_options = serve
+        if transport not in ("poll", "sse"):
+            raise ValueError(f"Unknown transport: {transport}")
+        self.transport = transport
         self.server_args = server_args
         self.input_names: T.Optional[T.List[str]] = None
         self.input_types: T.Optional[T.List[T.Type]] = None
@@ -51,8 +157,18 @@ class App(AllowWrapInstanceMethod):
             *input_widgets,
             html.Br(),
             html.Button("Run", id="run-btn"),
+            html.Button("Cancel", id="cancel-btn"),
+            html.Div(id="cancel-status"),
             html.Div("", style={"height": "20px"}),
+            dcc.Location(id="url"),
+            dcc.Store(id="session-id", storage_type="session"),
         ]
+        if self.transport == "sse":
+            sub_nodes.append(html.Div(id="sse-init", hidden=True))
+        if self.has_upload:
+            sub_nodes.append(html.Div(id="upload-init", hidden=True))
+        if self.job_manager.is_async:
+            sub_nodes += self.get_job_layout()
         if self.show_console:
             sub_nodes += self.get_console_layout()
         sub_nodes += self.get_result_layout()
@@ -64,21 +180,42 @@ class App(AllowWrapInstanceMethod):
         })
         return layout
 
-    def get_console_layout(self):
+    def get_job_layout(self):
+        if self.transport == "sse":
+            # clicked by the event listener when the job is finished
+            trigger = html.Button(id="job-fetch-btn", hidden=True)
+        else:
+            trigger = dcc.Interval(
+                id="job-interval", interval=self.job_poll_interval,
+                n_intervals=0, disabled=True)
         return [
+            dcc.Store(id="job-id"),
+            trigger,
+            html.Progress(id="job-progress", max=1, style={"width": "100%"}),
+            html.Div(id="job-status"),
+        ]
+
+    def get_console_layout(self):
+        src_doc = console_src_doc()
+        layout = [
             html.H3("Console"),
             html.Div("", style={"height": "20px"}),
-            dcc.Interval(
-                id="console-interval",
-                interval=self.console_interval, n_intervals=0),
-            html.Iframe(id="console-out", style={
+            html.Iframe(id="console-out", srcDoc=src_doc, style={
                 "width": "100%",
                 "max-width": "100%",
                 "height": "400px",
                 "resize": "both"
             }),
-            visdcc.Run_js(id="jsscroll", run="")
         ]
+        if self.transport == "poll":
+            layout += [
+                dcc.Interval(
+                    id="console-interval",
+                    interval=self.console_interval, n_intervals=0),
+                dcc.Store(id="console-cursor", data=0),
+                visdcc.Run_js(id="jsscroll", run=""),
+            ]
+        return layout
 
     def base_result_layout(self):
         return [
@@ -93,6 +230,13 @@ class App(AllowWrapInstanceMethod):
             layout += [
                 html.Div(id="show-text")
             ]
+        elif show_type == "download" and self.download_mode == "stream":
+            layout += [
+                html.A(
+                    html.Button("Download Result"),
+                    id="res-download-link", download="",
+                    style={"display": "none"}),
+            ]
         elif show_type == "download":
             layout += [
                 html.Button("Download Result", id="res-download-btn"),
@@ -112,11 +256,15 @@ class App(AllowWrapInstanceMethod):
         """Parse target function's arguments,
         return a list of input widgets."""
         widgets, names, types, attrs = [], [], [], []
-        desc = parse_func(self.func)
+        desc = get_func_desc(self.func)
         for a in desc.inputs:
             if a.type is None:
                 continue
             constructor = self.type_to_widget_constructor[a.type.__name__]
+            if self.upload and (a.type is InputPath):
+                constructor = UploadInputItem
+            if issubclass(constructor, UploadInputItem):
+                self.has_upload = True
             default = None if a.default is NotDef else a.default
             attr = a.kwargs
             widget = constructor(
@@ -138,11 +286,171 @@ class App(AllowWrapInstanceMethod):
         app = Dash(name, *args, **kwargs)
         app.layout = self.get_layout()
         self.add_callbacks(app)
+        self.add_routes(app)
         return app
 
+    def get_route_rule(self, app: "Dash", path: str) -> T.Tuple[str, str]:
+        """Get the rule and the endpoint name of a extra route
+        on the underlying Flask server."""
+        prefix = app.config.routes_pathname_prefix
+        rule = f"{prefix}_oneface/{path}"
+        endpoint = "oneface" + rule.replace("/", "_")
+        return rule, endpoint
+
+    def add_routes(self, app: "Dash"):
+        rule, endpoint = self.get_route_rule(app, "metrics")
+        app.server.add_url_rule(rule, endpoint, self.serve_metrics)
+        if self.transport == "sse":
+            rule, endpoint = self.get_route_rule(
+                app, "events/<session_id>")
+            app.server.add_url_rule(
+                rule, endpoint, self.serve_events)
+        if (self.result_show_type == "download") and \
+           (self.download_mode == "stream"):
+            rule, endpoint = self.get_route_rule(
+                app, "download/<session_id>")
+            app.server.add_url_rule(
+                rule, endpoint, self.serve_download)
+        if self.has_upload:
+            rule, endpoint = self.get_route_rule(
+                app, "upload/<session_id>")
+            app.server.add_url_rule(
+                rule, endpoint, self.serve_upload, methods=["POST"])
+
+    def use_shared_dir(self, directory: str):
+        """Keep the sessions and jobs state in the directory,
+        so they can be accessed by all worker processes."""
+        self.shared = SharedState(
+            directory, self.sessions.max_size, self.sessions.ttl)
+        self.job_manager.store = self.shared.jobs
+        if self.upload_dir is None:
+            self.upload_dir = self.shared.upload_dir
+
+    @property
+    def upload_root(self) -> str:
+        if self.upload_dir is None:
+            # temporary directory, removed when the program exits
+            self.upload_dir = tempfile.mkdtemp(prefix="oneface_upload_")
+            atexit.register(shutil.rmtree, self.upload_dir, True)
+        return self.upload_dir
+
+    @staticmethod
+    def serve_metrics():
+        """Metrics of the process in the Prometheus text format,
+        or the JSON summary with `?format=json`."""
+        if request.args.get("format") == "json":
+            return jsonify(metrics.summary())
+        return Response(
+            metrics.to_prometheus(),
+            mimetype="text/plain; version=0.0.4")
+
+    def serve_upload(self, session_id: str):
+        """Write the request body to a file in the upload directory,
+        chunk by chunk. Return the path of the file."""
+        max_size = self.upload_max_size
+        if (max_size is not None) and \
+           ((request.content_length or 0) > max_size):
+            abort(413)
+        root = self.upload_root
+        cleanup_uploads(root, self.sessions.ttl)
+        path = upload_path(root, session_id, request.args.get("name", ""))
+        try:
+            save_stream(request.stream, path, max_size)
+        except UploadTooLarge as e:
+            return Response(str(e), status=413)
+        return {"path": path}
+
+    def serve_download(self, session_id: str):
+        """Send the result file in chunks, support range requests."""
+        path = self.get_session(session_id).result
+        if (path is None) or (not os.path.isfile(path)):
+            abort(404)
+        return send_file(
+            os.path.abspath(path), as_attachment=True,
+            download_name=os.path.basename(path), conditional=True)
+
+    def get_session(self, session_id: str) -> Session:
+        if self.shared is not None:
+            def new_session():
+                self.shared.cleanup_consoles()
+                return SharedSession(
+                    self.shared, session_id, self.console_max_size)
+            return self.sessions.setdefault(session_id, new_session)
+        return self.sessions.setdefault(
+            session_id, lambda: Session(self.console_max_size))
+
     def add_callbacks(self, app: "Dash"):
+        self.add_session_callbacks(app)
         self.add_run_callbacks(app)
+        self.add_cancel_callbacks(app)
         self.add_result_callbacks(app)
+        if self.transport == "sse":
+            self.add_push_callbacks(app)
+        if self.has_upload:
+            self.add_upload_callbacks(app)
+
+    def add_push_callbacks(self, app: "Dash"):
+        url = app.config.requests_pathname_prefix + "_oneface/events/"
+        js = SSE_CLIENT_JS % {
+            "url": url, "max_chunks": self.console_max_chunks}
+        app.clientside_callback(
+            js, Output("sse-init", "children"),
+            Input("session-id", "data"))
+
+    def add_upload_callbacks(self, app: "Dash"):
+        url = app.config.requests_pathname_prefix + "_oneface/upload/"
+        app.clientside_callback(
+            UPLOAD_CLIENT_JS % {"url": url},
+            Output("upload-init", "children"),
+            Input("session-id", "data"))
+
+    def iter_events(
+            self, session_id: str, cursor: int = 0,
+            wait_timeout: float = 0.5,
+            heartbeat: float = 15.0) -> T.Iterator[str]:
+        """Generate server-sent events of the console output
+        and job status, only when they are changed."""
+        session = self.get_session(session_id)
+        job_state = None
+        idle = 0.0
+        while True:
+            changed = False
+            text, new_cursor, truncated = session.console.read_from(cursor)
+            if new_cursor != cursor:
+                cursor = new_cursor
+                changed = True
+                metrics.inc(
+                    "oneface_console_bytes_total", len(text.encode()),
+                    app=self.name)
+                yield format_sse(
+                    "console", console_to_html(text, truncated), cursor)
+            job = None
+            if session.job_id is not None:
+                job = self.job_manager.get(session.job_id)
+            state = None if job is None else (
+                job.id, job.status, job.progress.fraction,
+                job.progress.message, job.progress.n)
+            if (job is not None) and (state != job_state):
+                job_state = state
+                changed = True
+                yield format_sse("job", {
+                    "id": job.id, "status": job.status, "done": job.done,
+                    "progress": job.progress.fraction,
+                    "text": self.job_status_text(job)})
+            idle = 0.0 if changed else (idle + wait_timeout)
+            if idle >= heartbeat:
+                idle = 0.0
+                yield SSE_HEARTBEAT
+            session.console.wait(cursor, wait_timeout)
+
+    def serve_events(self, session_id: str):
+        cursor = int(request.headers.get("Last-Event-ID", 0))
+        resp = Response(
+            self.iter_events(session_id, cursor),
+            mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"
+        return resp
 
     def add_result_callbacks(self, app: "Dash"):
         show_type = self.result_show_type
@@ -158,8 +466,21 @@ class App(AllowWrapInstanceMethod):
                 "is not defined."
             )
 
-    def get_run_callback_decorator(self, app: "Dash"):
-        inputs = [Input("run-btn", 'n_clicks')]
+    def add_session_callbacks(self, app: "Dash"):
+        @app.callback(
+            Output("session-id", "data"),
+            Input("url", "pathname"),
+            State("session-id", "data"))
+        def init_session(_, session_id):
+            if session_id is None:
+                session_id = uuid.uuid4().hex
+            return session_id
+
+    def get_run_callback_decorator(self, app: "Dash", outputs=None):
+        inputs = [
+            Input("run-btn", 'n_clicks'),
+            Input("session-id", "data"),
+        ]
         for i, n in enumerate(self.input_names):
             is_interactive = (
                 self.interactive or
@@ -171,82 +492,250 @@ class App(AllowWrapInstanceMethod):
             else:
                 input = State(id_, "value")
             inputs.append(input)
-        output = Output("out", "data")
-        deco = app.callback(output, *inputs)
+        if outputs is None:
+            outputs = [Output("out", "data")]
+        deco = app.callback(*outputs, *inputs)
         return deco
 
+    def get_kwargs(self, args: tuple) -> dict:
+        kwargs = dict(zip(self.input_names, args))
+        for i, (k, v) in enumerate(kwargs.items()):
+            input_type = self.input_types[i]
+            tp_name = input_type.__name__
+            if tp_name in self.convert_types:
+                kwargs[k] = self.convert_types[tp_name](v)
+        return kwargs
+
     def add_run_callbacks(self, app):
-        console_buffer = StringIO()
+        if self.job_manager.is_async:
+            self.add_job_callbacks(app)
+        else:
+            @self.get_run_callback_decorator(app)
+            def run(n_clicks, session_id, *args):
+                if (session_id is None) or \
+                   ((not self.init_run) and (n_clicks is None)):
+                    raise PreventUpdate
+                kwargs = self.get_kwargs(args)
+                session = self.get_session(session_id)
+                job = self.job_manager.create(self.func, kwargs)
+                # make the running job can be cancelled by the session
+                session.job_id = job.id
+                self.job_manager.start(job, session.console)
+                if job.status == "cancelled":
+                    raise PreventUpdate
+                return self.set_result(session, job.result)
 
-        @self.get_run_callback_decorator(app)
-        def run(n_clicks, *args):
-            if (not self.init_run) and (n_clicks is None):
-                raise PreventUpdate
-            kwargs = dict(zip(self.input_names, args))
-            for i, (k, v) in enumerate(kwargs.items()):
-                input_type = self.input_types[i]
-                tp_name = input_type.__name__
-                if tp_name in self.convert_types:
-                    kwargs[k] = self.convert_types[tp_name](v)
-            with contextlib.redirect_stdout(console_buffer), \
-                 contextlib.redirect_stderr(console_buffer):
-                self.result = self.func(**kwargs)
-            return self.result
+        if self.show_console and (self.transport == "poll"):
+            self.add_console_callbacks(app)
 
-        if self.show_console:
-            self.add_console_callbacks(app, console_buffer)
+    def set_result(self, session: Session, result: T.Any) -> T.Any:
+        """Save the result to the session, return the data of the "out"
+        store. When the result is kept on the server, the data is a handle
+        and the result callbacks get the result from the session."""
+        session.result = self.result = result
+        if self.result_transport == "store":
+            return result
+        session.result_id = uuid.uuid4().hex
+        return {"result_id": session.result_id}
 
-    def add_console_callbacks(self, app, console_buffer):
+    def get_result(self, data: T.Any, session_id: T.Optional[str]) -> T.Any:
+        """Get the result from the data of the "out" store."""
+        if self.result_transport == "store":
+            return data
+        if (data is None) or (session_id is None):
+            return None
+        return self.get_session(session_id).result
+
+    def cancel_job(self, session_id: T.Optional[str]) -> str:
+        """Cancel the running job of the session,
+        the wrapped command line program is killed."""
+        if session_id is None:
+            return ""
+        job_id = self.get_session(session_id).job_id
+        if (job_id is None) or (not self.job_manager.cancel(job_id)):
+            return "No running job."
+        return f"Job {job_id[:8]}: cancel requested"
+
+    def add_cancel_callbacks(self, app: "Dash"):
         @app.callback(
-            Output("console-out", "srcDoc"),
-            Input("console-interval", "n_intervals"))
-        def update_console(n):
-            conv = Ansi2HTMLConverter()
-            console_buffer.seek(0)
-            lines = console_buffer.readlines()
-            html_ = conv.convert("".join(lines))
-            return html_
+            Output("cancel-status", "children"),
+            Input("cancel-btn", "n_clicks"),
+            State("session-id", "data"),
+            prevent_initial_call=True)
+        def cancel(n_clicks, session_id):
+            return self.cancel_job(session_id)
+
+    @staticmethod
+    def job_status_text(job) -> str:
+        text = f"Job {job.id[:8]}: {job.status}"
+        if job.status in ("failed", "cancelled"):
+            text += f", {job.error!r}"
+        elif job.status == "running":
+            progress = job.progress.text()
+            if progress:
+                text += f", {progress}"
+        return text
+
+    def fetch_job(self, job_id: T.Optional[str], session_id: str):
+        """Get the result and the status text of a job.
+        The result is `no_update` when the job is not done."""
+        job = self.job_manager.get(job_id) if job_id else None
+        if (job is None) or (session_id is None):
+            return no_update, ""
+        if job.status == "done":
+            session = self.get_session(session_id)
+            out = self.set_result(session, job.result)
+            return out, self.job_status_text(job)
+        return no_update, self.job_status_text(job)
+
+    def add_job_callbacks(self, app):
+        outputs = [Output("job-id", "data")]
+        if self.transport == "poll":
+            outputs.append(Output("job-interval", "disabled"))
+
+        @self.get_run_callback_decorator(app, outputs)
+        def submit(n_clicks, session_id, *args):
+            if (session_id is None) or \
+               ((not self.init_run) and (n_clicks is None)):
+                raise PreventUpdate
+            kwargs = self.get_kwargs(args)
+            session = self.get_session(session_id)
+            job = self.job_manager.submit(self.func, kwargs, session.console)
+            session.job_id = job.id
+            if self.transport == "poll":
+                return job.id, False
+            return job.id
+
+        if self.transport == "sse":
+            @app.callback(
+                Output("out", "data"),
+                Output("job-status", "children"),
+                Input("job-fetch-btn", "n_clicks"),
+                State("job-id", "data"),
+                State("session-id", "data"),
+                prevent_initial_call=True)
+            def fetch(n_clicks, job_id, session_id):
+                return self.fetch_job(job_id, session_id)
+        else:
+            @app.callback(
+                Output("out", "data"),
+                Output("job-status", "children"),
+                Output("job-progress", "value"),
+                Output("job-interval", "disabled"),
+                Input("job-interval", "n_intervals"),
+                State("job-id", "data"),
+                State("session-id", "data"))
+            def poll(n, job_id, session_id):
+                job = self.job_manager.get(job_id) if job_id else None
+                out, status = self.fetch_job(job_id, session_id)
+                finished = (job is None) or job.done
+                fraction = None if job is None else job.progress.fraction
+                if (job is not None) and (job.status == "done"):
+                    fraction = 1
+                return out, status, fraction, finished
+
+    def read_console(
+            self, session_id: str, cursor: int
+            ) -> T.Tuple[T.Optional[str], int]:
+        """Read the new console output after the cursor,
+        return the js code for append it to the console and the new cursor.
+        """
+        t0 = time.perf_counter()
+        metrics.inc("oneface_console_polls_total", app=self.name)
+        try:
+            return self._read_console(session_id, cursor)
+        finally:
+            metrics.observe(
+                "oneface_console_poll_seconds", time.perf_counter() - t0,
+                app=self.name)
 
-        doc_cache = None
+    def _read_console(
+            self, session_id: str, cursor: int
+            ) -> T.Tuple[T.Optional[str], int]:
+        console_buffer = self.get_session(session_id).console
+        text, new_cursor, truncated = console_buffer.read_from(cursor)
+        if (not text) and (new_cursor == cursor):
+            return None, cursor
+        # the buffer is reset if the cursor is ahead of it
+        reset = cursor > new_cursor
+        if reset:
+            text, new_cursor, truncated = console_buffer.read_from(0)
+        metrics.inc("oneface_console_bytes_total", len(text.encode()),
+                    app=self.name)
+        html_ = console_to_html(text, truncated)
+        js = CONSOLE_APPEND_JS.format(
+            html=json.dumps(html_), reset=json.dumps(reset),
+            max_chunks=self.console_max_chunks)
+        return js, new_cursor
 
+    def add_console_callbacks(self, app):
         @app.callback(
-            Output('jsscroll', 'run'),
-            Input('console-out', 'srcDoc'))
-        def scroll(doc):
-            scroll_cmd = """
-            var out = document.getElementById('console-out');
-            out.contentWindow.scrollTo(0, 999999999);
-            """
-            nonlocal doc_cache
-            if doc == doc_cache:
-                cmd = ""
-            else:
-                cmd = scroll_cmd
-            doc_cache = doc
-            return cmd
+            Output("jsscroll", "run"),
+            Output("console-cursor", "data"),
+            Input("console-interval", "n_intervals"),
+            State("console-cursor", "data"),
+            State("session-id", "data"))
+        def update_console(n, cursor, session_id):
+            if session_id is None:
+                raise PreventUpdate
+            js, new_cursor = self.read_console(session_id, cursor or 0)
+            if js is None:
+                raise PreventUpdate
+            return js, new_cursor
 
     def add_text_callback(self, app: "Dash"):
         @app.callback(
             Output("show-text", "children"),
-            Input("out", "data"))
-        def show(text):
-            return text
+            Input("out", "data"),
+            State("session-id", "data"))
+        def show(data, session_id):
+            result = self.get_result(data, session_id)
+            if result is None:
+                return result
+            return truncate_text(str(result), self.text_max_chars)
 
     def add_download_callbacks(self, app: "Dash"):
+        if self.download_mode == "stream":
+            prefix = app.config.requests_pathname_prefix
+            url = f"{prefix}_oneface/download/"
+
+            @app.callback(
+                Output("res-download-link", "href"),
+                Output("res-download-link", "style"),
+                Input("out", "data"),
+                State("session-id", "data"),
+                prevent_initial_call=True)
+            def show_link(data, session_id):
+                result = self.get_result(data, session_id)
+                if (result is None) or (session_id is None):
+                    return None, {"display": "none"}
+                # the file name makes the link changed for new results
+                name = os.path.basename(result)
+                return f"{url}{session_id}?name={quote(name)}", {}
+            return
+
         @app.callback(
             Output("res-download-index", "data"),
             Input("res-download-btn", "n_clicks"),
+            State("session-id", "data"),
             prevent_initial_call=True)
-        def send_file(n_clicks):
-            return dcc.send_file(self.result)
+        def send_file(n_clicks, session_id):
+            result = self.get_session(session_id).result
+            if result is None:
+                raise PreventUpdate
+            return dcc.send_file(result)
 
     def add_plotly_callbacks(self, app: "Dash"):
         @app.callback(
             Output("plotly-figure", "figure"),
             Input("out", "data"),
+            State("session-id", "data"),
         )
-        def show(data):
-            return data
+        def show(data, session_id):
+            fig = self.get_result(data, session_id)
+            if fig is None:
+                return no_update
+            return downsample_figure(fig, self.plotly_max_points)
 
     @classmethod
     def register_widget(cls, type, widget_constructor):
@@ -258,7 +747,49 @@ class App(AllowWrapInstanceMethod):
             converter = type
         cls.convert_types[type.__name__] = converter
 
+    def serve(
+            self, host: str = "127.0.0.1", port: int = 8050,
+            workers: T.Optional[int] = None, threads: int = 8,
+            server: T.Optional[str] = None,
+            shared_dir: T.Optional[str] = None,
+            **options):
+        """Serve the app with a production WSGI server,
+        'gunicorn'(multiple processes and threads) or 'waitress'
+        (single process, multiple threads), default is the available one.
+
+        The Dash app is built before forking the workers. With multiple
+        workers, the sessions and jobs state is kept in `shared_dir`,
+        default is a temporary directory removed at exit.
+        Other options are passed to the server."""
+        if server is None:
+            server = find_server()
+        if server not in ("gunicorn", "waitress"):
+            raise ValueError(f"Unknown server: {server}")
+        if workers is None:
+            workers = (os.cpu_count() or 1) if server == "gunicorn" else 1
+        if shared_dir is not None:
+            self.use_shared_dir(shared_dir)
+        elif (workers > 1) and (self.shared is None):
+            shared_dir = tempfile.mkdtemp(prefix="oneface_shared_")
+            atexit.register(remove_dir, shared_dir, os.getpid())
+            self.use_shared_dir(shared_dir)
+        self.dash_app = self.get_dash_app()
+        wsgi_app = self.dash_app.server
+        if server == "gunicorn":
+            run_gunicorn(wsgi_app, host, port, workers, threads, **options)
+        else:
+            run_waitress(wsgi_app, host, port, threads, **options)
+
     def __call__(self):
+        if self.serve_options:
+            options = self.serve_options
+            if not isinstance(options, dict):
+                options = {}
+            kwargs = {
+                k: v for k, v in self.server_args.items()
+                if k in ("host", "port")}
+            kwargs.update(options)
+            return self.serve(**kwargs)
         self.dash_app = self.get_dash_app()
         self.dash_app.run_server(**self.server_args)
 
@@ -0,0 +1,139 @@
+import os
+import html
+import time
+import typing as T
+import threading
+from collections import OrderedDict
+
+from flask import Flask, jsonify
+
+from .app import App
+
+if T.TYPE_CHECKING:
+    from dash import Dash
+
+
+def current_rss() -> T.Optional[int]:
+    """Resident memory of current process in bytes, None if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class HubEntry(object):
+    def __init__(self, app: App, path: str):
+        self.app = app
+        self.path = path
+        self.dash_app: T.Optional["Dash"] = None
+        self.build_time: T.Optional[float] = None
+        self.memory: T.Optional[int] = None
+        self.lock = threading.Lock()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.app.name, "path": self.path,
+            "built": self.dash_app is not None,
+            "build_time": self.build_time,
+            "memory": self.memory,
+        }
+
+
+class Hub(object):
+    """Serve many apps under one WSGI application.
+
+    Each Dash app is built on the first request to it's path, with it's
+    own Flask server, the requests are dispatched by the path prefix.
+    The apps share the same stylesheets and the assets folder. The index
+    page lists all apps, and `/_hub/stats` report the build time and
+    the memory increment(approximate) of each app.
+    """
+
+    def __init__(
+            self, title: str = "oneFace apps",
+            dash_kwargs: T.Optional[dict] = None):
+        self.title = title
+        # keyword arguments shared by all Dash apps
+        self.dash_kwargs = dash_kwargs or {}
+        self.entries: T.Dict[str, HubEntry] = OrderedDict()
+        self.server = Flask("oneface_hub")
+        self.server.add_url_rule("/", "index", self.index)
+        self.server.add_url_rule("/_hub/stats", "stats", self.serve_stats)
+
+    def add(
+            self, func: T.Callable, path: T.Optional[str] = None,
+            **app_kwargs) -> App:
+        """Register a function or an App, it is served under `path`,
+        default is the name of the function."""
+        app = func if isinstance(func, App) else App(func, **app_kwargs)
+        if path is None:
+            path = app.name
+        path = "/" + path.strip("/") + "/"
+        if path in self.entries:
+            raise ValueError(f"Path {path} is already registered.")
+        self.entries[path] = HubEntry(app, path)
+        return app
+
+    def route(self, path: T.Optional[str] = None, **app_kwargs):
+        """Decorator version of `add`, return the function itself."""
+        def deco(func):
+            self.add(func, path, **app_kwargs)
+            return func
+        return deco
+
+    def get_dash_app(self, path: str) -> "Dash":
+        entry = self.entries[path]
+        if entry.dash_app is None:
+            with entry.lock:
+                if entry.dash_app is None:
+                    mem0 = current_rss()
+                    t0 = time.perf_counter()
+                    dash_app = entry.app.get_dash_app(
+                        url_base_pathname=path, **self.dash_kwargs)
+                    entry.build_time = time.perf_counter() - t0
+                    mem1 = current_rss()
+                    if (mem0 is not None) and (mem1 is not None):
+                        entry.memory = mem1 - mem0
+                    entry.app.dash_app = entry.dash_app = dash_app
+        return entry.dash_app
+
+    def match(self, url_path: str) -> T.Optional[str]:
+        if not url_path.endswith("/"):
+            url_path += "/"
+        for path in self.entries:
+            if url_path.startswith(path):
+                return path
+        return None
+
+    def __call__(self, environ, start_response):
+        path = self.match(environ.get("PATH_INFO", "/"))
+        if path is None:
+            return self.server(environ, start_response)
+        dash_app = self.get_dash_app(path)
+        return dash_app.server(environ, start_response)
+
+    def stats(self) -> T.List[dict]:
+        return [e.stats() for e in self.entries.values()]
+
+    def serve_stats(self):
+        return jsonify(self.stats())
+
+    def index(self):
+        items = "\n".join(
+            f'<li><a href="{e.path}">{html.escape(e.app.name)}</a></li>'
+            for e in self.entries.values())
+        title = html.escape(self.title)
+        return (
+            f"<html><head><title>{title}</title></head><body>"
+            f"<h1>{title}</h1><ul>\n{items}\n</ul></body></html>")
+
+    def run(self, host: str = "127.0.0.1", port: int = 8088, **kwargs):
+        from werkzeug.serving import run_simple
+        kwargs.setdefault("threaded", True)
+        run_simple(host, port, self, **kwargs)
@@ -85,3 +85,18 @@ class MultiDropdownInputItem(InputItem):
             self.range,
             value=(self.default or self.range[0]), multi=True
         )
+
+
+class UploadInputItem(StrInputItem):
+    """Text input of the path on the server, with a file chooser
+    which uploads the file to the server and fills the path."""
+    def get_widget(self):
+        widget = super().get_widget()
+        upload_id = f"upload-{self.name}"
+        widget.children += [
+            html.Button(
+                "Upload file", id=upload_id,
+                **{"data-oneface-upload": self.input.id}),
+            html.Span(id=f"{upload_id}-status"),
+        ]
+        return widget
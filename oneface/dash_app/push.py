@@ -0,0 +1,55 @@
+import json
+import typing as T
+
+
+SSE_CLIENT_JS = """
+function(session_id) {
+    if (!session_id || window._onefaceEvents) {
+        return window.dash_clientside.no_update;
+    }
+    var source = new EventSource("%(url)s" + session_id);
+    window._onefaceEvents = source;
+    source.addEventListener("console", function(e) {
+        var out = document.getElementById("console-out");
+        if (out === null) { return; }
+        var doc = out.contentWindow.document;
+        var content = doc.getElementById("console-content");
+        if (content === null) { return; }
+        var span = doc.createElement("span");
+        span.innerHTML = JSON.parse(e.data);
+        content.appendChild(span);
+        while (content.childNodes.length > %(max_chunks)d) {
+            content.removeChild(content.firstChild);
+        }
+        out.contentWindow.scrollTo(0, 999999999);
+    });
+    source.addEventListener("job", function(e) {
+        var job = JSON.parse(e.data);
+        var status = document.getElementById("job-status");
+        if (status !== null) { status.innerText = job.text; }
+        var bar = document.getElementById("job-progress");
+        if ((bar !== null) && (job.progress !== null)) {
+            bar.value = job.progress;
+        }
+        if (job.done) {
+            var btn = document.getElementById("job-fetch-btn");
+            if (btn !== null) { btn.click(); }
+        }
+    });
+    return "";
+}
+"""
+
+
+def format_sse(
+        event: str, data: T.Any,
+        id_: T.Optional[T.Union[int, str]] = None) -> str:
+    """Format a server-sent event message."""
+    msg = f"event: {event}\n"
+    if id_ is not None:
+        msg += f"id: {id_}\n"
+    msg += f"data: {json.dumps(data)}\n\n"
+    return msg
+
+
+SSE_HEARTBEAT = ": ping\n\n"
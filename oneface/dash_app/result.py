@@ -0,0 +1,43 @@
+import math
+import typing as T
+
+
+def truncate_text(text: str, max_chars: T.Optional[int]) -> str:
+    """Keep the head of a long text for display."""
+    if (max_chars is None) or (len(text) <= max_chars):
+        return text
+    return text[:max_chars] + \
+        f"\n... [{len(text) - max_chars} of {len(text)} chars not shown]"
+
+
+def figure_to_dict(fig: T.Any) -> dict:
+    if hasattr(fig, "to_dict"):  # plotly Figure
+        fig = fig.to_dict()
+    return dict(fig)
+
+
+def downsample_figure(
+        fig: T.Any, max_points: T.Optional[int]) -> T.Any:
+    """Reduce the points of the scatter traces by striding, and render
+    them with WebGL, when the figure has more than `max_points` points."""
+    if max_points is None:
+        return fig
+    fig = figure_to_dict(fig)
+    traces = [dict(t) for t in fig.get("data", [])]
+    sizes = [len(t["y"]) if t.get("y") is not None else 0 for t in traces]
+    total = sum(sizes)
+    if total <= max_points:
+        return fig
+    for trace, size in zip(traces, sizes):
+        if trace.get("type", "scatter") not in ("scatter", "scattergl"):
+            continue
+        # each trace keep points in proportion to it's size
+        stride = math.ceil(total / max_points)
+        for key in ("x", "y", "text", "customdata"):
+            val = trace.get(key)
+            if (val is not None) and (not isinstance(val, str)) and \
+               len(val) == size:
+                trace[key] = val[::stride]
+        trace["type"] = "scattergl"
+    fig["data"] = traces
+    return fig
@@ -0,0 +1,63 @@
+import os
+import shutil
+import typing as T
+
+
+def find_server() -> str:
+    """Choose a WSGI server: gunicorn on POSIX systems, or waitress."""
+    if os.name == "posix":
+        try:
+            import gunicorn  # noqa: F401
+            return "gunicorn"
+        except ImportError:
+            pass
+    try:
+        import waitress  # noqa: F401
+        return "waitress"
+    except ImportError:
+        pass
+    raise ImportError(
+        "A WSGI server is required to serve the app, "
+        "please install gunicorn or waitress.")
+
+
+def run_gunicorn(
+        wsgi_app: T.Callable, host: str, port: int,
+        workers: int, threads: int, **options):
+    """Run with gunicorn. The app is loaded before forking the workers,
+    the worker processes handle requests with threads."""
+    from gunicorn.app.base import BaseApplication
+
+    config = {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "threads": threads,
+        "worker_class": "gthread",
+        "preload_app": True,
+    }
+    config.update(options)
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, val in config.items():
+                self.cfg.set(key, val)
+
+        def load(self):
+            return wsgi_app
+
+    Application().run()
+
+
+def run_waitress(
+        wsgi_app: T.Callable, host: str, port: int,
+        threads: int, **options):
+    """Run with waitress, a single process with a thread pool."""
+    from waitress import serve
+    serve(wsgi_app, host=host, port=port, threads=threads, **options)
+
+
+def remove_dir(path: str, owner_pid: int):
+    """Remove the directory, only in the process created it.
+    The forked workers also run the exit handlers."""
+    if os.getpid() == owner_pid:
+        shutil.rmtree(path, ignore_errors=True)
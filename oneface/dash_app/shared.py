@@ -0,0 +1,203 @@
+import os
+import time
+import typing as T
+import threading
+
+from werkzeug.utils import secure_filename
+
+from ..store import DiskStore
+
+
+# the file starts with the offset of its first retained byte
+HEADER_SIZE = 16
+
+
+def _header(start: int) -> bytes:
+    return f"{start:015d}\n".encode()
+
+
+def _same_file(f: T.BinaryIO, path: str) -> bool:
+    try:
+        return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+    except OSError:
+        return False
+
+
+class FileConsole(object):
+    """Console output in an append-only file, can be read by the
+    processes serving the same session. It has the same interface
+    with ConsoleBuffer, offsets are in bytes.
+
+    When the output exceeds `max_size` bytes, the file is replaced by
+    its newest half, and the offset of the first retained byte is
+    kept in the header, so the readers' offsets are still valid."""
+
+    def __init__(
+            self, path: str, max_size: int = 1000000,
+            poll_interval: float = 0.1):
+        self.path = path
+        self.max_size = max_size
+        self.poll_interval = poll_interval
+        self._file: T.Optional[T.BinaryIO] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read_state(f: T.BinaryIO) -> T.Tuple[int, int]:
+        """Offset of the first retained byte and the size of the text."""
+        header = f.read(HEADER_SIZE)
+        size = f.seek(0, os.SEEK_END) - HEADER_SIZE
+        try:
+            return int(header), max(size, 0)
+        except ValueError:  # the header is not written yet
+            return 0, 0
+
+    @property
+    def end(self) -> int:
+        try:
+            with open(self.path, 'rb') as f:
+                start, size = self._read_state(f)
+        except OSError:
+            return 0
+        return start + size
+
+    def _open(self) -> T.BinaryIO:
+        # unbuffered append, every write is visible to readers
+        f = open(self.path, 'ab', buffering=0)
+        if f.tell() == 0:
+            f.write(_header(0))
+        return f
+
+    def write(self, s: str) -> int:
+        if not s:
+            return 0
+        with self._lock:
+            # the file may be compacted or removed by another process
+            if (self._file is not None) and \
+               not _same_file(self._file, self.path):
+                self._file.close()
+                self._file = None
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(s.encode())
+            if self._file.tell() - HEADER_SIZE > self.max_size:
+                self._compact()
+        return len(s)
+
+    def _compact(self):
+        """Replace the file with the newest half of the text."""
+        with open(self.path, 'rb') as f:
+            start, size = self._read_state(f)
+            keep = min(self.max_size // 2, size)
+            f.seek(HEADER_SIZE + size - keep)
+            data = f.read(keep)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_header(start + size - keep))
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        self._file.close()
+        self._file = self._open()
+
+    def wait(self, offset: int, timeout: T.Optional[float] = None) -> bool:
+        t0 = time.monotonic()
+        while self.end <= offset:
+            if (timeout is not None) and \
+               (time.monotonic() - t0 >= timeout):
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+    def read_from(self, offset: int) -> T.Tuple[str, int, bool]:
+        try:
+            with open(self.path, 'rb') as f:
+                start, size = self._read_state(f)
+                if offset > start + size:  # the file is recreated
+                    return "", start + size, False
+                truncated = offset < start
+                offset = max(offset, start)
+                f.seek(HEADER_SIZE + offset - start)
+                data = f.read()
+        except OSError:
+            return "", 0, False
+        return data.decode(errors="replace"), offset + len(data), truncated
+
+    def getvalue(self) -> str:
+        return self.read_from(0)[0]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SharedState(object):
+    """Sessions and jobs state in a directory, shared by the
+    worker processes of the server."""
+
+    def __init__(
+            self, directory: str,
+            max_sessions: int = 256,
+            session_ttl: T.Optional[float] = 3600):
+        self.directory = directory
+        self.sessions = DiskStore(
+            os.path.join(directory, "sessions"),
+            2 * max_sessions, session_ttl)
+        self.jobs = DiskStore(
+            os.path.join(directory, "jobs"), 4 * max_sessions, session_ttl)
+        self.console_dir = os.path.join(directory, "console")
+        self.upload_dir = os.path.join(directory, "upload")
+        os.makedirs(self.console_dir, exist_ok=True)
+
+    def console_path(self, session_id: str) -> str:
+        return os.path.join(
+            self.console_dir, secure_filename(session_id) + ".log")
+
+    def cleanup_consoles(self):
+        """Remove the console files of the expired sessions."""
+        ttl = self.sessions.ttl
+        if ttl is None:
+            return
+        now = time.time()
+        for name in os.listdir(self.console_dir):
+            path = os.path.join(self.console_dir, name)
+            try:
+                if now - os.path.getmtime(path) > ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class SharedSession(object):
+    """Session with the result and job id saved in the shared state,
+    and the console output written to a file."""
+
+    def __init__(
+            self, shared: SharedState, session_id: str,
+            console_max_size: int = 1000000):
+        self.shared = shared
+        self.id = session_id
+        self.console = FileConsole(
+            shared.console_path(session_id), console_max_size)
+
+    def _get(self, name: str) -> T.Any:
+        return self.shared.sessions.get((self.id, name))
+
+    def _set(self, name: str, value: T.Any):
+        self.shared.sessions.set((self.id, name), value)
+
+    result = property(
+        lambda self: self._get("result"),
+        lambda self, val: self._set("result", val))
+    result_id = property(
+        lambda self: self._get("result_id"),
+        lambda self, val: self._set("result_id", val))
+    job_id = property(
+        lambda self: self._get("job_id"),
+        lambda self, val: self._set("job_id", val))
@@ -0,0 +1,108 @@
+import os
+import time
+import uuid
+import shutil
+import typing as T
+
+from werkzeug.utils import secure_filename
+
+
+# Upload the file selected by a hidden file chooser with XHR, the request
+# body is the raw file. Then set the returned server path to the input.
+UPLOAD_CLIENT_JS = """
+function(session_id) {
+    if (!session_id) { return ""; }
+    var url = "%(url)s";
+    var buttons = document.querySelectorAll("[data-oneface-upload]");
+    buttons.forEach(function(btn) {
+        if (btn.dataset.onefaceBound) { return; }
+        btn.dataset.onefaceBound = "1";
+        var chooser = document.createElement("input");
+        chooser.type = "file";
+        chooser.style.display = "none";
+        btn.parentNode.appendChild(chooser);
+        btn.addEventListener("click", function() { chooser.click(); });
+        chooser.addEventListener("change", function() {
+            var file = chooser.files[0];
+            if (!file) { return; }
+            var target = document.getElementById(btn.dataset.onefaceUpload);
+            var status = document.getElementById(btn.id + "-status");
+            var xhr = new XMLHttpRequest();
+            xhr.open("POST", url + session_id +
+                     "?name=" + encodeURIComponent(file.name));
+            xhr.upload.onprogress = function(e) {
+                if (e.lengthComputable) {
+                    var p = Math.round(100 * e.loaded / e.total);
+                    status.innerText = "Uploading: " + p + "%%";
+                }
+            };
+            xhr.onload = function() {
+                if (xhr.status !== 200) {
+                    status.innerText = "Upload failed: " + xhr.responseText;
+                    return;
+                }
+                var path = JSON.parse(xhr.responseText).path;
+                // set by the native setter, let React know the change
+                var setter = Object.getOwnPropertyDescriptor(
+                    window.HTMLInputElement.prototype, "value").set;
+                setter.call(target, path);
+                target.dispatchEvent(new Event("input", {bubbles: true}));
+                status.innerText = "Uploaded: " + file.name;
+                chooser.value = "";
+            };
+            xhr.onerror = function() {
+                status.innerText = "Upload failed.";
+            };
+            xhr.send(file);
+        });
+    });
+    return "";
+}
+"""
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def save_stream(
+        stream: T.BinaryIO, path: str,
+        max_size: T.Optional[int] = None,
+        chunk_size: int = 1 << 20) -> int:
+    """Write the stream to the file chunk by chunk.
+    The file is removed if the size exceeds `max_size`."""
+    size = 0
+    try:
+        with open(path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                size += len(chunk)
+                if (max_size is not None) and (size > max_size):
+                    raise UploadTooLarge(
+                        f"File size exceeds the limit: {max_size} bytes")
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return size
+
+
+def upload_path(root: str, session_id: str, filename: str) -> str:
+    """Path to save a uploaded file, in the directory of the session."""
+    session_dir = os.path.join(root, secure_filename(session_id))
+    os.makedirs(session_dir, exist_ok=True)
+    name = secure_filename(filename) or "upload"
+    return os.path.join(session_dir, f"{uuid.uuid4().hex[:8]}_{name}")
+
+
+def cleanup_uploads(root: str, max_age: T.Optional[float]):
+    """Remove the session directories not modified in `max_age` seconds."""
+    if (max_age is None) or (not os.path.isdir(root)):
+        return
+    now = time.time()
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
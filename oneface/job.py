@@ -0,0 +1,477 @@
+import os
+import sys
+import time
+import uuid
+import signal
+import functools
+import typing as T
+import threading
+import traceback
+import contextlib
+import multiprocessing as mp
+from contextvars import ContextVar
+from concurrent.futures import (
+    Executor, ThreadPoolExecutor, ProcessPoolExecutor, Future
+)
+
+from .store import TTLStore, DiskStore
+from .metrics import metrics
+from .console import capture_output
+from .progress_report import ProgressState, report
+
+
+ExecutorType = T.Union[str, Executor, None]
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class CancelToken(object):
+    """Signal the cancellation of a running job.
+    The code runs in the job can register callbacks(for example,
+    kill the subprocess) to the token of current job."""
+
+    def __init__(self):
+        self.cancelled = False
+        self.reason: T.Optional[str] = None
+        self._callbacks: T.List[T.Callable[[], T.Any]] = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, callback: T.Callable[[], T.Any]):
+        """Register a callback, it is called immediately
+        if the token is already cancelled."""
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: T.Callable[[], T.Any]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                traceback.print_exc()
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Set the token as the token of current thread/task."""
+        var_token = _current_token.set(self)
+        try:
+            yield self
+        finally:
+            _current_token.reset(var_token)
+
+
+_current_token: ContextVar[T.Optional[CancelToken]] = ContextVar(
+    "oneface_cancel_token", default=None)
+
+
+def current_token() -> T.Optional[CancelToken]:
+    """Get the cancel token of the running job."""
+    return _current_token.get()
+
+
+def check_cancelled():
+    """Raise JobCancelled if the running job is cancelled.
+    Call it in the long running python functions to make them
+    can be cancelled."""
+    token = _current_token.get()
+    if (token is not None) and token.cancelled:
+        raise JobCancelled(token.reason)
+
+
+class Job(object):
+    def __init__(self, func: T.Callable, kwargs: dict):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.kwargs = kwargs
+        self.status = "pending"
+        self.result: T.Any = None
+        self.error: T.Optional[BaseException] = None
+        self.future: T.Optional[Future] = None
+        self.token = CancelToken()
+        self.progress = ProgressState()
+        self.start_time: T.Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel the job. The job is marked as cancelled immediately,
+        the pending job will not run, the running subprocess is killed."""
+        if self.done:
+            return
+        if self.future is not None:
+            self.future.cancel()
+        self.token.cancel(reason)
+        self.mark_cancelled()
+
+    def mark_cancelled(self):
+        self.status = "cancelled"
+        self.error = JobCancelled(self.token.reason)
+
+    def to_record(self) -> dict:
+        """The state of the job, can be pickled and shared between
+        processes."""
+        return {
+            "id": self.id, "status": self.status,
+            "result": self.result, "error": self.error,
+            "progress": (
+                self.progress.fraction, self.progress.message,
+                self.progress.n, self.progress.total),
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Job":
+        """Snapshot of a job running in another process."""
+        job = cls(None, {})
+        job.id = record["id"]
+        job.status = record["status"]
+        job.result = record["result"]
+        job.error = record["error"]
+        # set the fields directly, `update` would mark it as rendered now
+        progress = job.progress
+        progress.fraction, progress.message, progress.n, progress.total = \
+            record["progress"]
+        return job
+
+    def __repr__(self):
+        return f"<Job id={self.id} status={self.status}>"
+
+
+class _PipeWriter(object):
+    """File-like object send the written text through a pipe."""
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, s: str) -> int:
+        if s:
+            self.conn.send(("out", s))
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+class _PipeProgress(ProgressState):
+    """Send the progress to the parent process, rate-limited."""
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+
+    def render(self):
+        self.conn.send(
+            ("progress", (self.fraction, self.message, self.n, self.total)))
+
+
+def _process_target(conn, func: T.Callable, kwargs: dict):
+    if hasattr(os, "setpgrp"):
+        # new process group, the subprocesses can be killed together
+        os.setpgrp()
+    writer = _PipeWriter(conn)
+    with contextlib.redirect_stdout(writer), \
+         contextlib.redirect_stderr(writer):
+        try:
+            with _PipeProgress(conn).activate():
+                res = func(**kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            try:
+                conn.send(("error", e))
+            except Exception:  # exception is not picklable
+                conn.send(("error", RuntimeError(repr(e))))
+        else:
+            conn.send(("result", res))
+    conn.close()
+
+
+def kill_process(proc: mp.Process):
+    """Kill the process and the subprocesses started by it."""
+    if proc.pid is None:
+        return
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+            return
+        except OSError:
+            pass
+    proc.kill()
+
+
+def run_in_process(func: T.Callable, kwargs: dict) -> T.Any:
+    """Run the function in a child process.
+    The output of the child process will be forwarded to
+    the current sys.stdout."""
+    recv_conn, send_conn = mp.Pipe(duplex=False)
+    proc = mp.Process(
+        target=_process_target, args=(send_conn, func, kwargs),
+        daemon=True)
+    proc.start()
+    send_conn.close()
+    token = current_token()
+    kill = functools.partial(kill_process, proc)
+    if token is not None:
+        token.on_cancel(kill)
+    msg = None
+    try:
+        while True:
+            try:
+                msg = recv_conn.recv()
+            except EOFError:
+                break
+            if msg[0] == "out":
+                sys.stdout.write(msg[1])
+            elif msg[0] == "progress":
+                report(*msg[1])
+            else:
+                break
+    finally:
+        recv_conn.close()
+        proc.join()
+        if token is not None:
+            token.remove_callback(kill)
+    if (token is not None) and token.cancelled:
+        raise JobCancelled(token.reason)
+    if (msg is None) or (msg[0] in ("out", "progress")):
+        raise RuntimeError(
+            f"Worker process exited unexpectedly(code: {proc.exitcode}).")
+    kind, val = msg
+    if kind == "error":
+        raise val
+    return val
+
+
+def make_executor(
+        executor: ExecutorType,
+        max_workers: T.Optional[int] = None) -> T.Optional[Executor]:
+    """Create the executor according to it's type name.
+
+    'thread': run jobs in a thread pool.
+    'process': run each job in a child process,
+        at most `max_workers` processes run at the same time.
+    'queue': run jobs one by one in a background thread.
+    """
+    if (executor is None) or isinstance(executor, Executor):
+        return executor
+    if executor in ("thread", "process"):
+        return ThreadPoolExecutor(max_workers=max_workers)
+    elif executor == "queue":
+        return ThreadPoolExecutor(max_workers=1)
+    else:
+        raise ValueError(f"Unknown executor type: {executor}")
+
+
+class JobManager(object):
+    """Submit jobs to a pluggable executor and track their status.
+    When the executor is None, jobs are run in the caller's thread.
+
+    With a shared `store`, the states of the jobs are saved to it,
+    so the managers in other processes can get the status, the result
+    and request the cancellation of them."""
+
+    def __init__(
+            self, executor: ExecutorType = None,
+            max_workers: T.Optional[int] = None,
+            max_jobs: int = 1024,
+            job_ttl: T.Optional[float] = 3600,
+            timeout: T.Optional[float] = None,
+            store: T.Optional[DiskStore] = None,
+            sync_interval: float = 0.5,
+            labels: T.Optional[dict] = None):
+        self.executor_type = executor
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._executor: T.Optional[Executor] = None
+        self.jobs = TTLStore(max_jobs, job_ttl)
+        self.store = store
+        self.sync_interval = sync_interval
+        # labels of the metrics, for example the interface and app name
+        self.labels = labels or {}
+        metrics.gauge("oneface_queue_depth", self.queue_depth, **self.labels)
+
+    @property
+    def executor(self) -> T.Optional[Executor]:
+        # create lazily, avoid start threads before the server forked
+        if (self._executor is None) and (self.executor_type is not None):
+            self._executor = make_executor(
+                self.executor_type, self.max_workers)
+        return self._executor
+
+    @property
+    def is_async(self) -> bool:
+        return self.executor_type is not None
+
+    def queue_depth(self) -> int:
+        """Number of the pending and running jobs."""
+        return sum(not job.done for job in self.jobs.values())
+
+    def record(self, job: Job):
+        """Record the metrics of a finished job."""
+        metrics.inc("oneface_runs_total", status=job.status, **self.labels)
+        if job.start_time is not None:
+            metrics.observe(
+                "oneface_run_seconds", time.perf_counter() - job.start_time,
+                **self.labels)
+
+    def save(self, job: Job):
+        """Save the state of the job to the shared store."""
+        if self.store is None:
+            return
+        try:
+            self.store.set(job.id, job.to_record())
+        except Exception as e:  # result or error is not picklable
+            record = job.to_record()
+            record.update(
+                status="failed", result=None,
+                error=RuntimeError(f"Can not share the job state: {e!r}"))
+            self.store.set(job.id, record)
+
+    def _sync(self, job: Job):
+        """Save the progress of a running job and check the cancel
+        requests from other processes, until the job is done."""
+        last_render = None
+        while not job.done:
+            reason = self.store.get(("cancel", job.id))
+            if reason is not None:
+                job.cancel(reason)
+                self.save(job)
+                break
+            if job.progress.last_render != last_render:
+                last_render = job.progress.last_render
+                self.save(job)
+            time.sleep(self.sync_interval)
+
+    def run_job(self, job: Job, stream: T.Optional[T.TextIO] = None):
+        if job.token.cancelled:
+            return None
+        job.status = "running"
+        job.start_time = time.perf_counter()
+        if self.store is not None:
+            self.save(job)
+            threading.Thread(
+                target=self._sync, args=(job,), daemon=True).start()
+        try:
+            return self._run_job(job, stream)
+        finally:
+            self.record(job)
+            self.save(job)
+
+    def _run_job(self, job: Job, stream: T.Optional[T.TextIO] = None):
+        if stream is None:
+            redirect = contextlib.nullcontext()
+        else:
+            redirect = capture_output(stream)
+        timer = None
+        if self.timeout is not None:
+            timer = threading.Timer(
+                self.timeout, job.cancel, args=("timeout",))
+            timer.daemon = True
+            timer.start()
+        try:
+            with redirect, job.token.activate(), job.progress.activate():
+                try:
+                    if self.executor_type == "process":
+                        res = run_in_process(job.func, job.kwargs)
+                    else:
+                        res = job.func(**job.kwargs)
+                except Exception as e:
+                    if job.token.cancelled:
+                        job.mark_cancelled()
+                        return None
+                    job.error = e
+                    job.status = "failed"
+                    if self.is_async and (self.executor_type != "process"):
+                        traceback.print_exc()
+                    raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        job.result = res
+        if job.token.cancelled:
+            job.mark_cancelled()
+        else:
+            job.status = "done"
+        return job.result
+
+    def _on_pool_done(self, job: Job, future: Future):
+        err = future.exception()
+        if err is None:
+            job.result = future.result()
+            job.status = "done"
+        else:
+            job.error = err
+            job.status = "failed"
+        self.record(job)
+        self.save(job)
+
+    def create(self, func: T.Callable, kwargs: dict) -> Job:
+        job = Job(func, kwargs)
+        self.jobs.set(job.id, job)
+        self.save(job)
+        return job
+
+    def submit(
+            self, func: T.Callable, kwargs: dict,
+            stream: T.Optional[T.TextIO] = None) -> Job:
+        """Submit a job, the output of the job will write to `stream`."""
+        return self.start(self.create(func, kwargs), stream)
+
+    def start(self, job: Job, stream: T.Optional[T.TextIO] = None) -> Job:
+        """Start a created job."""
+        func, kwargs = job.func, job.kwargs
+        if self.executor is None:
+            self.run_job(job, stream)
+        elif isinstance(self.executor, ProcessPoolExecutor):
+            # user provided process pool, output can not be captured
+            job.status = "running"
+            job.start_time = time.perf_counter()
+            job.future = self.executor.submit(func, **kwargs)
+            self.save(job)
+            job.future.add_done_callback(
+                functools.partial(self._on_pool_done, job))
+        else:
+            job.future = self.executor.submit(self.run_job, job, stream)
+        return job
+
+    def get(self, job_id: str) -> T.Optional[Job]:
+        job = self.jobs.get(job_id)
+        if (job is None) and (self.store is not None):
+            record = self.store.get(job_id)
+            if record is not None:
+                job = Job.from_record(record)
+        return job
+
+    def cancel(self, job_id: str, reason: str = "cancelled") -> bool:
+        """Cancel a job, it can be running in another process.
+        Return False if the job is not found or already done."""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            if job.done:
+                return False
+            job.cancel(reason)
+            self.save(job)
+            return True
+        job = self.get(job_id)
+        if (job is None) or job.done:
+            return False
+        self.store.set(("cancel", job_id), reason)
+        return True
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,222 @@
+import sys
+import json
+import time
+import bisect
+import weakref
+import typing as T
+import threading
+import contextlib
+
+
+# upper bounds of the latency histograms, in seconds
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0, 300.0)
+
+HELP = {
+    "oneface_calls_total": "Calls of the checked functions.",
+    "oneface_call_errors_total": "Calls raised an exception.",
+    "oneface_check_errors_total": "Calls with invalid arguments.",
+    "oneface_cache_hits_total": "Calls returned the cached result.",
+    "oneface_check_seconds": "Time spent on checking the arguments.",
+    "oneface_call_seconds": "Time spent in the function.",
+    "oneface_runs_total": "Runs started from the interfaces, by status.",
+    "oneface_run_seconds": "Time of the runs started from the interfaces.",
+    "oneface_queue_depth": "Jobs pending or running.",
+    "oneface_console_polls_total": "Console reads of the dash app.",
+    "oneface_console_bytes_total": "Console text sent to the browsers.",
+    "oneface_console_poll_seconds": "Time of the console reads.",
+}
+
+Labels = T.Tuple[T.Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter(object):
+    def __init__(self):
+        self.value: float = 0
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1):
+        with self._lock:
+            self.value += value
+
+
+class Histogram(object):
+    def __init__(self, buckets: T.Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if i < len(self.buckets):
+                self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def cumulative(self) -> T.List[T.Tuple[str, int]]:
+        res, acc = [], 0
+        for le, n in zip(self.buckets, self.counts):
+            acc += n
+            res.append((repr(le), acc))
+        res.append(("+Inf", self.count))
+        return res
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count, "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "max": self.max,
+        }
+
+
+class Metrics(object):
+    """Counters, histograms and gauges of the running process.
+
+    `counter` and `histogram` return the metric of the labels, hot
+    paths can keep it to avoid looking it up on every update.
+    Gauges are functions evaluated when the metrics are exported,
+    the bound methods are kept by weak references, so registering
+    them does not keep the objects alive."""
+
+    def __init__(self):
+        self.counters: T.Dict[str, T.Dict[Labels, Counter]] = {}
+        self.histograms: T.Dict[str, T.Dict[Labels, Histogram]] = {}
+        self.gauges: T.Dict[str, T.Dict[Labels, T.Callable]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = _labels(labels)
+        with self._lock:
+            counters = self.counters.setdefault(name, {})
+            if key not in counters:
+                counters[key] = Counter()
+            return counters[key]
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = _labels(labels)
+        with self._lock:
+            hists = self.histograms.setdefault(name, {})
+            if key not in hists:
+                hists[key] = Histogram()
+            return hists[key]
+
+    def inc(self, name: str, value: float = 1, **labels):
+        self.counter(name, **labels).inc(value)
+
+    def observe(self, name: str, value: float, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def gauge(self, name: str, func: T.Callable[[], float], **labels):
+        if hasattr(func, "__self__"):
+            ref = weakref.WeakMethod(func)
+        else:
+            ref = (lambda: func)
+        with self._lock:
+            self.gauges.setdefault(name, {})[_labels(labels)] = ref
+
+    def _gauge_values(self) -> T.Dict[str, T.Dict[Labels, float]]:
+        values: T.Dict[str, T.Dict[Labels, float]] = {}
+        with self._lock:
+            for name, refs in self.gauges.items():
+                for key, ref in list(refs.items()):
+                    func = ref()
+                    if func is None:  # the object is collected
+                        del refs[key]
+                        continue
+                    values.setdefault(name, {})[key] = func
+        for name, funcs in values.items():
+            for key, func in funcs.items():
+                funcs[key] = func()
+        return values
+
+    def summary(self) -> dict:
+        """Metrics as a JSON serializable dict."""
+        res: T.Dict[str, T.List[dict]] = {}
+        gauges = self._gauge_values()
+        with self._lock:
+            for name, vals in self.counters.items():
+                res[name] = [
+                    {"labels": dict(k), "value": c.value}
+                    for k, c in vals.items()]
+            for name, vals in gauges.items():
+                res[name] = [
+                    {"labels": dict(k), "value": v} for k, v in vals.items()]
+            for name, hists in self.histograms.items():
+                res[name] = [
+                    {"labels": dict(k), **h.to_dict()}
+                    for k, h in hists.items()]
+        return res
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines: T.List[str] = []
+
+        def header(name: str, tp: str):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {tp}")
+
+        gauges = self._gauge_values()
+        with self._lock:
+            for name, vals in sorted(self.counters.items()):
+                header(name, "counter")
+                for key, c in vals.items():
+                    lines.append(f"{name}{_format_labels(key)} {c.value}")
+            for name, vals in sorted(gauges.items()):
+                header(name, "gauge")
+                for key, v in vals.items():
+                    lines.append(f"{name}{_format_labels(key)} {v}")
+            for name, hists in sorted(self.histograms.items()):
+                header(name, "histogram")
+                for key, h in hists.items():
+                    for le, n in h.cumulative():
+                        labels = _format_labels(key + (("le", le),))
+                        lines.append(f"{name}_bucket{labels} {n}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {h.sum}")
+                    lines.append(
+                        f"{name}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(key: Labels) -> str:
+    if not key:
+        return ""
+    items = ",".join(
+        '{}="{}"'.format(
+            k, v.replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n"))
+        for k, v in key)
+    return "{" + items + "}"
+
+
+# metrics of current process
+metrics = Metrics()
+
+
+def dump(path: str = "-"):
+    """Write the JSON summary to a file, "-" for the stdout."""
+    text = json.dumps(metrics.summary(), indent=2)
+    if path == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        with open(path, 'w') as f:
+            f.write(text)
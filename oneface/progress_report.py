@@ -0,0 +1,174 @@
+import time
+import typing as T
+import contextlib
+from contextvars import ContextVar
+
+
+class ProgressState(object):
+    """Progress of a running job.
+
+    Written by the job thread and read by the interfaces, the fields are
+    plain attributes so no lock is needed. `render` is called at most
+    once every `min_interval` seconds, the interfaces push the progress
+    to the screen by overriding it."""
+
+    def __init__(self, min_interval: float = 0.1):
+        self.min_interval = min_interval
+        self.fraction: T.Optional[float] = None
+        self.message = ""
+        self.n = 0
+        self.total: T.Optional[int] = None
+        self.start_time: T.Optional[float] = None
+        self.last_render = 0.0
+
+    def update(
+            self, fraction: T.Optional[float] = None,
+            message: T.Optional[str] = None,
+            n: T.Optional[int] = None,
+            total: T.Optional[int] = None):
+        now = time.monotonic()
+        if self.start_time is None:
+            self.start_time = now
+        if n is not None:
+            self.n = n
+        if total is not None:
+            self.total = total
+        if fraction is None and self.total:
+            fraction = self.n / self.total
+        if fraction is not None:
+            self.fraction = min(max(fraction, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if now - self.last_render >= self.min_interval:
+            self.last_render = now
+            self.render()
+
+    def render(self):
+        pass
+
+    def close(self):
+        """Called when the job is finished."""
+        if self.start_time is not None:
+            self.render()
+
+    @property
+    def elapsed(self) -> float:
+        if self.start_time is None:
+            return 0.0
+        return time.monotonic() - self.start_time
+
+    @property
+    def rate(self) -> T.Optional[float]:
+        """Items processed per second."""
+        elapsed = self.elapsed
+        if (elapsed <= 0) or (self.n == 0):
+            return None
+        return self.n / elapsed
+
+    @property
+    def eta(self) -> T.Optional[float]:
+        """Estimated seconds to finish."""
+        if not self.fraction:
+            return None
+        return self.elapsed * (1 - self.fraction) / self.fraction
+
+    def to_dict(self) -> dict:
+        return {
+            "fraction": self.fraction, "message": self.message,
+            "n": self.n, "total": self.total,
+            "rate": self.rate, "eta": self.eta,
+        }
+
+    def text(self) -> str:
+        parts = []
+        if self.fraction is not None:
+            parts.append(f"{self.fraction:.0%}")
+        if self.total:
+            parts.append(f"{self.n}/{self.total}")
+        rate, eta = self.rate, self.eta
+        if rate is not None:
+            parts.append(f"{rate:.2f}it/s")
+        if eta is not None:
+            parts.append(f"ETA {eta:.0f}s")
+        if self.message:
+            parts.append(self.message)
+        return " ".join(parts)
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Set the state as the progress of current thread/task."""
+        var_token = _current_progress.set(self)
+        try:
+            yield self
+        finally:
+            _current_progress.reset(var_token)
+            self.close()
+
+
+class RichProgress(ProgressState):
+    """Render the progress with a rich progress bar."""
+
+    def __init__(self, min_interval: float = 0.1):
+        super().__init__(min_interval)
+        self.bar = None
+        self.task_id = None
+
+    def render(self):
+        if self.bar is None:
+            from rich.progress import Progress
+            from .check import get_console
+            self.bar = Progress(console=get_console())
+            self.bar.start()
+            self.task_id = self.bar.add_task("", total=None)
+        total = self.total or (None if self.fraction is None else 1.0)
+        completed = self.n if self.total else (self.fraction or 0.0)
+        self.bar.update(
+            self.task_id, total=total, completed=completed,
+            description=self.message)
+
+    def close(self):
+        super().close()
+        if self.bar is not None:
+            self.bar.stop()
+            self.bar = None
+
+
+_current_progress: ContextVar[T.Optional[ProgressState]] = ContextVar(
+    "oneface_progress", default=None)
+
+
+def current_progress() -> T.Optional[ProgressState]:
+    return _current_progress.get()
+
+
+def report(
+        fraction: T.Optional[float] = None,
+        message: T.Optional[str] = None,
+        n: T.Optional[int] = None,
+        total: T.Optional[int] = None):
+    """Report the progress of the running job.
+    Do nothing when it is not run by an interface."""
+    state = _current_progress.get()
+    if state is not None:
+        state.update(fraction, message, n, total)
+
+
+def progress(
+        iterable: T.Iterable,
+        total: T.Optional[int] = None,
+        message: T.Optional[str] = None) -> T.Iterator:
+    """Iterate and report the progress.
+
+    >>> for i in progress(range(100)):
+    ...     pass
+    """
+    state = _current_progress.get()
+    if state is None:
+        yield from iterable
+        return
+    if total is None and hasattr(iterable, "__len__"):
+        total = len(iterable)
+    state.update(n=0, total=total, message=message)
+    for i, item in enumerate(iterable, 1):
+        yield item
+        state.update(n=i)
@@ -1,29 +1,114 @@
+import json
+import time
 import typing as T
 import functools
+import threading
+import traceback
+import contextlib
 
 from qtpy import QtWidgets
+from qtpy import QtGui
 from qtpy import QtCore
-from funcdesc.parse import parse_func
 from funcdesc.desc import NotDef
 from funcdesc.types import (
     InputPath, OutputPath, OneOf, SubSet
 )
 
-from .utils import AllowWrapInstanceMethod, get_callable_name
+from .utils import (
+    AllowWrapInstanceMethod, get_callable_name, get_func_desc
+)
+from .job import CancelToken, JobCancelled, run_in_process
+from .console import ConsoleBuffer, capture_output
+from .progress_report import ProgressState
+from .metrics import metrics
 
 
-class Worker(QtCore.QObject):
-    finished = QtCore.Signal()
+class WorkerSignals(QtCore.QObject):
+    started = QtCore.Signal(object)
+    finished = QtCore.Signal(object)
 
-    def __init__(self, func, func_kwargs, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+
+class Worker(QtCore.QRunnable):
+    """Run the function in the thread pool,
+    the worker itself is emitted by the signals."""
+
+    def __init__(
+            self, func, func_kwargs, index: int = 0,
+            timeout: T.Optional[float] = None,
+            backend: str = "thread",
+            stream: T.Optional[T.TextIO] = None,
+            labels: T.Optional[dict] = None):
+        super().__init__()
+        self.setAutoDelete(False)
         self.func = func
         self.func_kwargs = func_kwargs
+        self.index = index
+        self.timeout = timeout
+        self.backend = backend
+        self.stream = stream
+        self.labels = labels or {}
+        self.status = "pending"
         self.result = None
+        self.error: T.Optional[BaseException] = None
+        self.token = CancelToken()
+        self.progress = ProgressState()
+        self.signals = WorkerSignals()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def cancel(self):
+        self.token.cancel()
+        if self.status == "pending":
+            self.status = "cancelled"
+
+    def call(self):
+        if self.backend == "process":
+            # output of the child process is forwarded through a pipe
+            return run_in_process(self.func, self.func_kwargs)
+        return self.func(**self.func_kwargs)
 
     def run(self):
-        self.result = self.func(**self.func_kwargs)
-        self.finished.emit()
+        if self.token.cancelled:
+            self.status = "cancelled"
+            self.signals.finished.emit(self)
+            return
+        self.status = "running"
+        self.signals.started.emit(self)
+        t0 = time.perf_counter()
+        timer = None
+        if self.timeout is not None:
+            timer = threading.Timer(
+                self.timeout, self.token.cancel, args=("timeout",))
+            timer.daemon = True
+            timer.start()
+        if self.stream is None:
+            capture = contextlib.nullcontext()
+        else:
+            capture = capture_output(self.stream)
+        try:
+            with capture, self.token.activate(), self.progress.activate():
+                if self.stream is not None:
+                    print(f"--- Run #{self.index} ---")
+                self.result = self.call()
+            self.status = "cancelled" if self.token.cancelled else "done"
+        except JobCancelled as e:
+            self.status = "cancelled"
+            print(f"Job cancelled: {e}")
+        except Exception as e:
+            self.error = e
+            self.status = "failed"
+            traceback.print_exc()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            metrics.inc(
+                "oneface_runs_total", status=self.status, **self.labels)
+            metrics.observe(
+                "oneface_run_seconds", time.perf_counter() - t0,
+                **self.labels)
+            self.signals.finished.emit(self)
 
 
 def gui(func=None, **kwargs):
@@ -47,12 +132,35 @@ class GUI(AllowWrapInstanceMethod):
             self,
             func: T.Callable, name: T.Optional[str] = None,
             size: T.Optional[T.List] = None,
-            run_once=True):
+            run_once=True,
+            timeout: T.Optional[float] = None,
+            max_workers: int = 1,
+            backend: str = "thread",
+            terminal_interval: int = 100,
+            terminal_max_lines: int = 10000,
+            terminal_max_size: int = 1000000):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown backend: {backend}")
+        self.backend = backend
         self.func = func
         self.run_once = run_once
+        self.timeout = timeout
         self.result = None
         self.app = get_app()
+        self.runs: T.List[Worker] = []
+        self.pool = QtCore.QThreadPool()
+        self.pool.setMaxThreadCount(max_workers)
+        self.terminal_max_lines = terminal_max_lines
+        # output of the runs, appended to the terminal in batches
+        self.console = ConsoleBuffer(terminal_max_size)
+        self.console_cursor = 0
+        # refresh the terminal and the progress bar
+        self.refresh_timer = QtCore.QTimer()
+        self.refresh_timer.setInterval(terminal_interval)
+        self.refresh_timer.timeout.connect(self.refresh)
         self.name = get_callable_name(func, name)
+        self.labels = {"interface": "qt", "app": self.name}
+        metrics.gauge("oneface_queue_depth", self.queue_depth, **self.labels)
         self.window = QtWidgets.QWidget()
         self.window._oneface_wrap = self
         self.window.setWindowTitle(self.name)
@@ -67,11 +175,27 @@ class GUI(AllowWrapInstanceMethod):
         self.compose_arg_widgets(self.layout)
         self.run_btn = QtWidgets.QPushButton("Run")
         self.layout.addWidget(self.run_btn)
-        self.terminal = QtWidgets.QTextEdit()
+        self.cancel_btn = QtWidgets.QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.run_list = QtWidgets.QListWidget()
+        self.run_list.setSelectionMode(
+            QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.terminal = QtWidgets.QPlainTextEdit()
+        self.terminal.setReadOnly(True)
+        self.terminal.setMaximumBlockCount(self.terminal_max_lines)
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.metrics_btn = QtWidgets.QPushButton("Metrics")
+        if not self.run_once:
+            self.layout.addWidget(self.cancel_btn)
+            self.layout.addWidget(self.progress_bar)
+            self.layout.addWidget(self.run_list)
+            self.layout.addWidget(self.terminal)
+            self.layout.addWidget(self.metrics_btn)
         self.window.setLayout(self.layout)
 
     def compose_arg_widgets(self, layout: QtWidgets.QVBoxLayout):
-        desc = parse_func(self.func)
+        desc = get_func_desc(self.func)
         for a in desc.inputs:
             if a.type is None:
                 continue
@@ -86,6 +210,8 @@ class GUI(AllowWrapInstanceMethod):
 
     def connect_events(self):
         self.run_btn.clicked.connect(self.run_func)
+        self.cancel_btn.clicked.connect(self.cancel_func)
+        self.metrics_btn.clicked.connect(self.show_metrics)
 
     def get_args(self):
         kwargs = {}
@@ -95,25 +221,114 @@ class GUI(AllowWrapInstanceMethod):
 
     def run_func(self):
         kwargs = self.get_args()
+        worker = Worker(
+            self.func, kwargs, len(self.runs) + 1,
+            timeout=self.timeout, backend=self.backend,
+            stream=None if self.run_once else self.console,
+            labels=self.labels)
         if self.run_once:
             self.run_btn.setEnabled(False)
-            self.result = self.func(**kwargs)
+            worker.run()
+            if worker.status == "failed":
+                raise worker.error
+            self.result = worker.result
             self.window.close()
         else:
-            thread = self.thread = QtCore.QThread()
-            worker = self.worker = Worker(self.func, kwargs)
-            worker.moveToThread(thread)
-            thread.started.connect(worker.run)
-            worker.finished.connect(thread.quit)
-            worker.finished.connect(worker.deleteLater)
-            thread.finished.connect(thread.deleteLater)
-            thread.start()
-            self.run_btn.setEnabled(False)
-
-            def finish():
-                self.result = worker.result
-                self.run_btn.setEnabled(True)
-            thread.finished.connect(finish)
+            self.runs.append(worker)
+            self.run_list.addItem(self.run_text(worker))
+            worker.signals.started.connect(self.update_run)
+            worker.signals.finished.connect(self.on_finished)
+            self.pool.start(worker)
+            self.refresh_timer.start()
+            self.cancel_btn.setEnabled(True)
+
+    @staticmethod
+    def run_text(worker: Worker) -> str:
+        args = ", ".join(f"{k}={v!r}" for k, v in worker.func_kwargs.items())
+        return f"#{worker.index} {worker.status}: {args}"
+
+    def update_run(self, worker: Worker):
+        item = self.run_list.item(worker.index - 1)
+        item.setText(self.run_text(worker))
+        self.cancel_btn.setEnabled(
+            any(not w.done for w in self.runs))
+
+    def on_finished(self, worker: Worker):
+        if worker.status == "done":
+            self.result = worker.result
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(1000)
+            self.progress_bar.setFormat(f"#{worker.index} done")
+        self.update_run(worker)
+
+    def refresh(self):
+        self.update_progress()
+        self.flush_terminal()
+        if all(w.done for w in self.runs):
+            self.refresh_timer.stop()
+
+    def update_progress(self):
+        """Show the progress of the latest running run."""
+        running = [w for w in self.runs if w.status == "running"]
+        if not running:
+            return
+        progress = running[-1].progress
+        if progress.fraction is None:
+            self.progress_bar.setRange(0, 0)  # busy indicator
+        else:
+            self.progress_bar.setRange(0, 1000)
+            self.progress_bar.setValue(int(progress.fraction * 1000))
+        self.progress_bar.setFormat(
+            f"#{running[-1].index} {progress.text()}")
+
+    def flush_terminal(self):
+        """Append the new output to the terminal in one batch."""
+        text, self.console_cursor, truncated = \
+            self.console.read_from(self.console_cursor)
+        if not text:
+            return
+        # only the tail lines will be kept by the terminal
+        lines = text.split("\n")
+        if len(lines) > self.terminal_max_lines:
+            lines = lines[-self.terminal_max_lines:]
+            truncated = True
+        if truncated:
+            lines.insert(0, "[Some output is dropped]")
+        self.terminal.moveCursor(QtGui.QTextCursor.MoveOperation.End)
+        self.terminal.insertPlainText("\n".join(lines))
+        self.terminal.ensureCursorVisible()
+
+    def cancel_func(self):
+        """Cancel the selected runs, or all the unfinished runs
+        if nothing is selected. The wrapped command line program is killed."""
+        rows = [i.row() for i in self.run_list.selectedIndexes()]
+        workers = [self.runs[r] for r in rows] or self.runs
+        for worker in workers:
+            if not worker.done:
+                worker.cancel()
+                self.update_run(worker)
+
+    def queue_depth(self) -> int:
+        return sum(not w.done for w in self.runs)
+
+    @staticmethod
+    def metrics_text() -> str:
+        """JSON summary of the metrics."""
+        return json.dumps(metrics.summary(), indent=2)
+
+    def show_metrics(self):
+        box = QtWidgets.QMessageBox(self.window)
+        box.setWindowTitle("Metrics")
+        box.setText(f"Runs of {self.name}")
+        box.setDetailedText(self.metrics_text())
+        box.show()
+
+    def wait(self, msecs: int = -1) -> bool:
+        """Wait all runs finished and deliver the results."""
+        res = self.pool.waitForDone(msecs)
+        self.app.processEvents()
+        self.refresh()
+        return res
 
     def __call__(self):
         self.window.show()
@@ -0,0 +1,205 @@
+import os
+import time
+import pickle
+import hashlib
+import typing as T
+import threading
+import contextlib
+from collections import OrderedDict
+
+
+_missing = object()
+
+
+class TTLStore(object):
+    """A bounded key-value store.
+    When it is full the least recently used item will be evicted,
+    and items older than `ttl` seconds are expired."""
+
+    def __init__(self, max_size: int = 128, ttl: T.Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[T.Hashable, T.Tuple[float, T.Any]]" = \
+            OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _is_expired(self, put_time: float, now: float) -> bool:
+        return (self.ttl is not None) and (now - put_time > self.ttl)
+
+    def evict_expired(self):
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            # items are ordered by access time, oldest first
+            while self._data:
+                key, (put_time, _) = next(iter(self._data.items()))
+                if not self._is_expired(put_time, now):
+                    break
+                self._data.popitem(last=False)
+
+    def get(self, key: T.Hashable, default: T.Any = None) -> T.Any:
+        now = time.monotonic()
+        with self._lock:
+            if key not in self._data:
+                return default
+            put_time, val = self._data[key]
+            if self._is_expired(put_time, now):
+                del self._data[key]
+                return default
+            self._data[key] = (now, val)
+            self._data.move_to_end(key)
+            return val
+
+    def set(self, key: T.Hashable, value: T.Any):
+        self.evict_expired()
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def setdefault(self, key: T.Hashable, factory: T.Callable[[], T.Any]):
+        """Get the value, if not exist create it with the `factory`."""
+        self.evict_expired()
+        now = time.monotonic()
+        with self._lock:
+            if (key in self._data) and \
+                    not self._is_expired(self._data[key][0], now):
+                val = self._data[key][1]
+            else:
+                val = factory()
+            self._data[key] = (now, val)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+            return val
+
+    def pop(self, key: T.Hashable, default: T.Any = None) -> T.Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._data.pop(key)[1]
+
+    def values(self) -> T.List[T.Any]:
+        """Values of the items not expired."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                val for put_time, val in self._data.values()
+                if not self._is_expired(put_time, now)]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: T.Hashable) -> bool:
+        return self.get(key, _missing) is not _missing
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskStore(object):
+    """A bounded key-value store keep the pickled values in a directory.
+    It has the same interface with TTLStore, and can be shared between
+    processes."""
+
+    def __init__(
+            self, directory: str,
+            max_size: int = 128, ttl: T.Optional[float] = None):
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: T.Hashable) -> str:
+        name = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, name + ".pkl")
+
+    def _files(self) -> T.List[str]:
+        return [
+            os.path.join(self.directory, f)
+            for f in os.listdir(self.directory) if f.endswith(".pkl")]
+
+    def _is_expired(self, path: str) -> bool:
+        if self.ttl is None:
+            return False
+        return time.time() - os.path.getmtime(path) > self.ttl
+
+    def evict_expired(self):
+        if self.ttl is None:
+            return
+        for path in self._files():
+            with contextlib.suppress(OSError):
+                if self._is_expired(path):
+                    os.remove(path)
+
+    def get(self, key: T.Hashable, default: T.Any = None) -> T.Any:
+        path = self._path(key)
+        try:
+            if self._is_expired(path):
+                os.remove(path)
+                return default
+            with open(path, 'rb') as f:
+                val = pickle.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+        return val
+
+    def set(self, key: T.Hashable, value: T.Any):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)  # atomic, readers never see half file
+        self.evict_expired()
+        files = self._files()
+        if len(files) > self.max_size:
+            # other threads or processes may remove the files meanwhile
+            mtimes = []
+            for f in files:
+                with contextlib.suppress(OSError):
+                    mtimes.append((os.path.getmtime(f), f))
+            mtimes.sort()
+            for _, old in mtimes[:len(mtimes) - self.max_size]:
+                with contextlib.suppress(OSError):
+                    os.remove(old)
+
+    def setdefault(self, key: T.Hashable, factory: T.Callable[[], T.Any]):
+        val = self.get(key, _missing)
+        if val is _missing:
+            val = factory()
+            self.set(key, val)
+        return val
+
+    def pop(self, key: T.Hashable, default: T.Any = None) -> T.Any:
+        val = self.get(key, default)
+        with contextlib.suppress(OSError):
+            os.remove(self._path(key))
+        return val
+
+    def clear(self):
+        for path in self._files():
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+    def __contains__(self, key: T.Hashable) -> bool:
+        return self.get(key, _missing) is not _missing
+
+    def __len__(self) -> int:
+        return len(self._files())
@@ -1,6 +1,13 @@
 import typing as T
+import inspect
 import functools
 
+from funcdesc.desc import Description
+from funcdesc.mark import FUNC_MARK_STORE_KEY
+from funcdesc.parse import parse_func
+
+from .store import TTLStore
+
 
 class AllowWrapInstanceMethod(object):
     def __get__(self, obj, objtype):
@@ -19,3 +26,25 @@ def get_callable_name(func, name: T.Optional[str]) -> str:
         return func.name
     else:
         return func.__name__
+
+
+# (function, description) keyed by the function id and signature hash.
+# The function is kept in the entry so the id can not be reused.
+_desc_cache = TTLStore(max_size=1024)
+
+
+def get_func_desc(func: T.Callable) -> Description:
+    """Parse the function description, the result is cached and shared.
+    The cache is keyed by the function identity and the hash of it's
+    signature and marks, so the changed function is parsed again."""
+    marks = getattr(func, "__dict__", {}).get(FUNC_MARK_STORE_KEY)
+    sig_hash = hash((
+        str(inspect.signature(func)),
+        repr(None if marks is None else vars(marks)),
+    ))
+    key = (id(func), sig_hash)
+    entry = _desc_cache.get(key)
+    if (entry is None) or (entry[0] is not func):
+        entry = (func, parse_func(func))
+        _desc_cache.set(key, entry)
+    return entry[1]
@@ -2,11 +2,6 @@ import sys
 import typing as T
 import os.path as osp
 
-import fire
-
-from .wrap import wrap_cli, load_config
-from ..core import one
-
 
 FILE_DIR = osp.dirname(osp.abspath(__file__))
 EXAMPLE_FILE = osp.join(FILE_DIR, "example.yaml")
@@ -25,26 +20,73 @@ InterfaceTypes = T.Literal["cli", "qt_gui", "dash_app"]
 
 def run(
         config_path: str, interface: InterfaceTypes,
-        print_cmd: bool = True, **kwargs):
+        print_cmd: bool = True, serve: bool = False,
+        metrics_file: T.Optional[str] = None, **kwargs):
     """
     :param config_path: The path to your config(.yaml) file.
     :param interface: The interface type, 'qt_gui' | 'dash_app' | 'cli'
     :param print_cmd: Print the actually executed command or not.
+    :param serve: Serve the dash app with a production WSGI server,
+        the server options are read from `serve` in `dash_config`.
+    :param metrics_file: Write the JSON summary of the metrics to the file
+        when the interface exits, '-' for the stdout.
     """
+    from .wrap import wrap_cli, load_config
+    from ..core import one
     config = load_config(config_path)
     wrap = wrap_cli(config, print_cmd=print_cmd)
     of = one(wrap, **kwargs)
-    if interface == "qt_gui":
-        ret_code = of.qt_gui(**config.get('qt_config', {}))
-    elif interface == "dash_app":
-        ret_code = of.dash_app(**config.get('dash_config', {}))
-    else:
-        ret_code = of.cli()
+    try:
+        if interface == "qt_gui":
+            ret_code = of.qt_gui(**config.get('qt_config', {}))
+        elif interface == "dash_app":
+            dash_config = config.get('dash_config', {})
+            if serve and not dash_config.get('serve'):
+                dash_config['serve'] = True
+            ret_code = of.dash_app(**dash_config)
+        else:
+            ret_code = of.cli()
+    finally:
+        if metrics_file is not None:
+            from ..metrics import dump
+            dump(metrics_file)
     sys.exit(ret_code)
 
 
+def sweep(
+        config_path: str,
+        grid: T.Optional[str] = None,
+        list_file: T.Optional[str] = None,
+        out_dir: str = "./sweep_out",
+        max_parallel: T.Optional[int] = None,
+        resume: bool = True):
+    """
+    :param config_path: The path to your config(.yaml) file.
+    :param grid: YAML/JSON file map argument names to lists of values,
+        all combinations of them will be run.
+    :param list_file: YAML/JSON(or JSON lines) file of argument sets.
+    :param out_dir: Directory to store the logs and the summary file.
+    :param max_parallel: Max number of runs at the same time.
+    :param resume: Skip the successful runs recorded in the summary file.
+    """
+    from .wrap import load_config
+    from .sweep import Sweep, load_arg_sets
+    config = load_config(config_path)
+    sweep_config = config.get('sweep_config', {})
+    if max_parallel is None:
+        max_parallel = sweep_config.get('max_parallel')
+    arg_sets = load_arg_sets(grid, list_file)
+    records = Sweep(
+        config, arg_sets, out_dir, max_parallel, resume).run()
+    n_failed = sum(r['retcode'] != 0 for r in records)
+    print(f"Finished {len(records)} runs, {n_failed} failed.")
+    sys.exit(1 if n_failed else 0)
+
+
 if __name__ == "__main__":
+    import fire
     fire.Fire({
         'run': run,
+        'sweep': sweep,
         'generate': gen,
     })
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import functools
+import typing as T
+from io import StringIO
+
+from cmd2func.utils import Tee
+from funcdesc.types import InputPath, OutputPath
+
+from .wrap import CLICommand
+
+
+def path_signature(path: str, hash_content: bool = False) -> T.Any:
+    """Describe the state of a input path,
+    use the mtime and size or the content hash of the files."""
+    if os.path.isdir(path):
+        return sorted(
+            (os.path.relpath(os.path.join(root, f), path),
+             path_signature(os.path.join(root, f), hash_content))
+            for root, _, files in os.walk(path) for f in files
+        )
+    if not os.path.exists(path):
+        return None
+    if hash_content:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(functools.partial(f.read, 1 << 20), b''):
+                h.update(block)
+        return h.hexdigest()
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def copy_path(src: str, dst: str):
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        dst_dir = os.path.dirname(os.path.abspath(dst))
+        os.makedirs(dst_dir, exist_ok=True)
+        shutil.copy2(src, dst)
+
+
+class CommandCache(object):
+    """Content-addressed disk cache of a wrapped command.
+
+    The cache key covers the rendered command string, the argument values
+    and the state of InputPath arguments. The output of the command and
+    the files of the OutputPath arguments are saved, and restored when the
+    command is called with the same key. Only successful runs are cached.
+    """
+
+    def __init__(
+            self, func: CLICommand,
+            dir: str = "./.oneface_cache",
+            hash_inputs: bool = False):
+        self.command = func
+        functools.update_wrapper(self, func)
+        self.cache_dir = dir
+        self.hash_inputs = hash_inputs
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def desc(self):
+        return self.command.formater.desc
+
+    @property
+    def out_stream(self) -> T.TextIO:
+        return self.command.out_stream or sys.stdout
+
+    @out_stream.setter
+    def out_stream(self, stream: T.TextIO):
+        self.command.out_stream = stream
+
+    @property
+    def err_stream(self) -> T.TextIO:
+        return self.command.err_stream or sys.stderr
+
+    @err_stream.setter
+    def err_stream(self, stream: T.TextIO):
+        self.command.err_stream = stream
+
+    def get_key(self, cmd_str: str, vals: dict) -> str:
+        inputs = {}
+        for arg in self.desc.inputs:
+            if arg.type is InputPath:
+                inputs[arg.name] = path_signature(
+                    str(vals[arg.name]), self.hash_inputs)
+        content = json.dumps({
+            "command": cmd_str,
+            "values": {k: repr(v) for k, v in vals.items()},
+            "inputs": inputs,
+        }, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def output_paths(self, vals: dict) -> T.Dict[str, str]:
+        return {
+            arg.name: str(vals[arg.name]) for arg in self.desc.inputs
+            if arg.type is OutputPath
+        }
+
+    def restore(self, entry: str, vals: dict) -> int:
+        with open(os.path.join(entry, "meta.json")) as f:
+            meta = json.load(f)
+        for name, path in self.output_paths(vals).items():
+            saved = os.path.join(entry, "outputs", name)
+            if os.path.exists(saved):
+                copy_path(saved, path)
+        if self.command.is_print_cmd:
+            print(f"Use cached result of: {meta['command']}")
+        for fname, stream in [
+                ("stdout.txt", self.out_stream),
+                ("stderr.txt", self.err_stream)]:
+            with open(os.path.join(entry, fname)) as f:
+                stream.write(f.read())
+        return meta['retcode']
+
+    def save(
+            self, entry: str, cmd_str: str, retcode: int,
+            vals: dict, out: str, err: str):
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        os.makedirs(os.path.join(tmp, "outputs"), exist_ok=True)
+        for name, path in self.output_paths(vals).items():
+            if os.path.exists(path):
+                copy_path(path, os.path.join(tmp, "outputs", name))
+        with open(os.path.join(tmp, "stdout.txt"), 'w') as f:
+            f.write(out)
+        with open(os.path.join(tmp, "stderr.txt"), 'w') as f:
+            f.write(err)
+        with open(os.path.join(tmp, "meta.json"), 'w') as f:
+            json.dump({"command": cmd_str, "retcode": retcode}, f)
+        try:
+            os.replace(tmp, entry)
+        except OSError:  # saved by another process
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def __call__(self, *args, **kwargs) -> int:
+        vals = self.desc.parse_pass_in(args, kwargs)
+        cmd_str = self.command.get_cmd_str(*args, **kwargs)
+        key = self.get_key(cmd_str, vals)
+        entry = os.path.join(self.cache_dir, key)
+        if os.path.exists(os.path.join(entry, "meta.json")):
+            self.hits += 1
+            return self.restore(entry, vals)
+        self.misses += 1
+        out, err = StringIO(), StringIO()
+        retcode = self.command.run_cmd(
+            cmd_str, Tee(self.out_stream, out), Tee(self.err_stream, err))
+        if retcode == 0:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.save(
+                entry, cmd_str, retcode, vals,
+                out.getvalue(), err.getvalue())
+        return retcode
@@ -0,0 +1,71 @@
+import typing as T
+import subprocess as subp
+from queue import Queue
+
+from cmd2func.runner import ProcessRunner
+
+
+class StreamRunner(ProcessRunner):
+    """Stream the output of the subprocess line by line.
+
+    The lines are passed through a bounded queue, when the consumer is
+    slow the reader threads block and the child process blocks on the
+    full pipe. The output after `max_output` characters is discarded,
+    but the pipes are still drained to let the child process exit.
+    """
+
+    def __init__(
+            self, command: str,
+            queue_size: int = 1000,
+            max_output: T.Optional[int] = None) -> None:
+        super().__init__(command)
+        self.queue = Queue(queue_size)
+        self.max_output = max_output
+        self.n_written = 0
+        self.truncated = False
+        self.killed = False
+
+    def stream(self):
+        num_end_signals = int(self.t_stdout is not None) + \
+            int(self.t_stderr is not None)
+        for _ in range(num_end_signals):
+            for source, line in iter(self.queue.get, None):
+                src = "stdout" if source is self.proc.stdout else "stderr"
+                yield src, line.decode(errors="replace")
+        return self.proc.wait()
+
+    def write_stream_until_stop(
+            self, out_file: T.TextIO, err_file: T.TextIO) -> int:
+        g = self.stream()
+        while True:
+            try:
+                src, line = next(g)
+            except StopIteration as e:
+                return e.value
+            if self.truncated:
+                continue
+            if (self.max_output is not None) and \
+               (self.n_written + len(line) > self.max_output):
+                self.truncated = True
+                err_file.write(
+                    f"[Output exceeds {self.max_output} characters, "
+                    "the rest is discarded.]\n")
+                err_file.flush()
+                continue
+            self.n_written += len(line)
+            f = out_file if src == "stdout" else err_file
+            f.write(line)
+            f.flush()
+
+    def kill(self, timeout: float = 3.0):
+        """Terminate the child process, kill it if it is not
+        exited after `timeout` seconds."""
+        self.killed = True
+        proc = self.proc
+        if (proc is None) or (proc.poll() is not None):
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout)
+        except subp.TimeoutExpired:
+            proc.kill()
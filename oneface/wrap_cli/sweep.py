@@ -0,0 +1,124 @@
+import os
+import json
+import time
+import itertools
+import threading
+import typing as T
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from .wrap import wrap_cli
+from ..core import one
+
+
+def load_arg_sets(
+        grid: T.Optional[str] = None,
+        list_file: T.Optional[str] = None) -> T.List[dict]:
+    """Load the argument sets from a grid file or a list file.
+
+    The grid file is a YAML/JSON mapping from argument names to
+    lists of values, all combinations of them are generated.
+    The list file is a YAML/JSON list of mappings, or a JSON lines file.
+    """
+    arg_sets: T.List[dict] = []
+    if grid is not None:
+        with open(grid) as f:
+            conf = yaml.safe_load(f)
+        names = list(conf.keys())
+        values = [v if isinstance(v, list) else [v] for v in conf.values()]
+        for comb in itertools.product(*values):
+            arg_sets.append(dict(zip(names, comb)))
+    if list_file is not None:
+        with open(list_file) as f:
+            if list_file.endswith(".jsonl"):
+                arg_sets += [json.loads(line) for line in f if line.strip()]
+            else:
+                arg_sets += yaml.safe_load(f)
+    return arg_sets
+
+
+def load_summary(path: str) -> T.Dict[int, dict]:
+    records = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    records[rec['index']] = rec
+    return records
+
+
+class Sweep(object):
+    """Run the wrapped command with many argument sets concurrently.
+
+    The output of each run is written to a log file in `out_dir`, and
+    the records of finished runs are appended to `summary.jsonl`.
+    The runs failed to start(invalid arguments, missing executable...)
+    are recorded with the error and the retcode -1, the other runs
+    go on. Successful runs recorded in the summary are skipped when
+    resuming.
+    """
+
+    def __init__(
+            self, config: dict, arg_sets: T.List[dict],
+            out_dir: str = "./sweep_out",
+            max_parallel: T.Optional[int] = None,
+            resume: bool = True):
+        self.config = config
+        self.arg_sets = arg_sets
+        self.out_dir = out_dir
+        self.max_parallel = max_parallel or os.cpu_count() or 1
+        self.resume = resume
+        self.summary_path = os.path.join(out_dir, "summary.jsonl")
+        self._lock = threading.Lock()
+
+    def run_one(self, index: int, args: dict) -> dict:
+        log_path = os.path.join(self.out_dir, f"run-{index:04d}.log")
+        record = {
+            "index": index, "args": args, "log": log_path,
+            "retcode": None, "error": None,
+        }
+        t0 = time.time()
+        with open(log_path, 'w') as log:
+            wrap = wrap_cli(self.config, print_cmd=False)
+            wrap.out_stream = wrap.err_stream = log
+            try:
+                record['retcode'] = one(wrap, print_args=False)(**args)
+            except Exception as e:
+                record['retcode'] = -1
+                record['error'] = repr(e)
+                log.write(f"{record['error']}\n")
+        record['elapsed'] = time.time() - t0
+        with self._lock, open(self.summary_path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+        status = "ok" if record['retcode'] == 0 else "failed"
+        print(f"[{index + 1}/{len(self.arg_sets)}] {status}: {args}")
+        return record
+
+    def get_todo(self) -> T.List[T.Tuple[int, dict]]:
+        done = {}
+        if self.resume:
+            done = load_summary(self.summary_path)
+        elif os.path.exists(self.summary_path):
+            os.remove(self.summary_path)
+        todo = []
+        for i, args in enumerate(self.arg_sets):
+            rec = done.get(i)
+            if (rec is not None) and (rec['retcode'] == 0) and \
+               (rec['args'] == args):
+                continue
+            todo.append((i, args))
+        return todo
+
+    def run(self) -> T.List[dict]:
+        os.makedirs(self.out_dir, exist_ok=True)
+        todo = self.get_todo()
+        skipped = len(self.arg_sets) - len(todo)
+        if skipped:
+            print(f"Skip {skipped} finished runs.")
+        # the work is done in subprocesses, threads are enough to drive them
+        with ThreadPoolExecutor(self.max_parallel) as pool:
+            futures = [pool.submit(self.run_one, i, a) for i, a in todo]
+            records = [f.result() for f in futures]
+        return records
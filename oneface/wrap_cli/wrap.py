@@ -1,7 +1,22 @@
+import sys
+import copy
+import typing as T
+
 import yaml
-from cmd2func import cmd2func
+from cmd2func.core import Cmd2Func
 from cmd2func.config import CLIConfig
 from funcdesc import mark_input
+from funcdesc.types import InputPath, OutputPath
+
+from .runner import StreamRunner
+from ..job import current_token
+
+
+# types can not be evaluated by cmd2func
+PATH_TYPES = {
+    "InputPath": InputPath,
+    "OutputPath": OutputPath,
+}
 
 
 def load_config(path: str) -> dict:
@@ -10,10 +25,69 @@ def load_config(path: str) -> dict:
     return conf
 
 
+class CLICommand(Cmd2Func):
+    """Wrapped command, the output is streamed to `out_stream` and
+    `err_stream` line by line. They are resolved to the `sys.stdout`
+    and `sys.stderr` when the command runs if not set, so the output
+    can be captured by the interfaces."""
+
+    def __init__(
+            self, *args,
+            max_output: T.Optional[int] = None,
+            queue_size: int = 1000,
+            **kwargs):
+        kwargs.setdefault("out_stream", None)
+        kwargs.setdefault("err_stream", None)
+        super().__init__(*args, **kwargs)
+        self.max_output = max_output
+        self.queue_size = queue_size
+
+    def run_cmd(
+            self, cmd_str: str,
+            out_stream: T.Optional[T.TextIO] = None,
+            err_stream: T.Optional[T.TextIO] = None) -> int:
+        """Run the command and return the return code.
+        The output is written to the given streams or the default ones.
+        The child process is killed when the current job is cancelled."""
+        out_stream = out_stream or self.out_stream or sys.stdout
+        err_stream = err_stream or self.err_stream or sys.stderr
+        cmd_str = self.process_cmd_str(cmd_str)
+        self.lastest_cmd_str = cmd_str
+        if self.is_print_cmd:
+            print(f"Run command: {cmd_str}")
+        runner = StreamRunner(cmd_str, self.queue_size, self.max_output)
+        runner.run(**self.kwargs_popen)
+        token = current_token()
+        if token is not None:
+            token.on_cancel(runner.kill)
+        try:
+            return runner.write_stream_until_stop(out_stream, err_stream)
+        finally:
+            if token is not None:
+                token.remove_callback(runner.kill)
+
+
 def wrap_cli(config: CLIConfig, print_cmd=True):
-    func = cmd2func(config['command'], config, print_cmd=print_cmd)
+    cmd_config = copy.deepcopy(config)
+    path_args = {}
+    for name, arg in cmd_config['inputs'].items():
+        if arg.get('type') in PATH_TYPES:
+            path_args[name] = PATH_TYPES[arg['type']]
+            arg['type'] = 'str'
+    func = CLICommand(
+        config['command'], cmd_config, print_cmd=print_cmd,
+        max_output=config.get('max_output'))
+    for val in func.formater.desc.inputs:
+        if val.name in path_args:
+            val.type = path_args[val.name]
     for name, arg in config['inputs'].items():
         if 'range' in arg:
             func = mark_input(name, range=arg['range'])(func)
     func.name = config['name']
+    if config.get('cache'):
+        from .cache import CommandCache
+        cache_conf = config['cache']
+        if not isinstance(cache_conf, dict):
+            cache_conf = {}
+        func = CommandCache(func, **cache_conf)
     return func
@@ -0,0 +1,78 @@
+import timeit
+
+from oneface.check import check_args
+from oneface.metrics import metrics
+from funcdesc import Val
+
+
+def test_check_args_overhead():
+    def bare(a, b, c=1.0):
+        return a
+
+    @check_args(print_args=False)
+    def checked(a: Val[int, [0, 10]], b: Val[str], c: Val[float] = 1.0):
+        return a
+
+    n = 2000
+    big = "a" * 10 ** 6
+    t_bare = min(timeit.repeat(lambda: bare(1, big), number=n, repeat=3))
+    t_checked = min(
+        timeit.repeat(lambda: checked(1, big), number=n, repeat=3))
+    overhead = (t_checked - t_bare) / n
+    print(
+        f"\nbare call: {t_bare / n * 1e6:.2f}us, "
+        f"@check_args call: {t_checked / n * 1e6:.2f}us, "
+        f"overhead: {overhead * 1e6:.2f}us per call")
+    # the overhead should not grow with the size of values
+    assert overhead < 1e-3
+
+
+def test_metrics_overhead():
+    def add(a: Val[int, [0, 10]], b: Val[int]):
+        return a + b
+
+    checked = check_args(add, print_args=False, name="bench_add")
+    recorded = check_args(
+        add, print_args=False, name="bench_add_metrics", metrics=True)
+    n = 2000
+    t_checked = min(timeit.repeat(lambda: checked(1, 2), number=n, repeat=3))
+    t_recorded = min(
+        timeit.repeat(lambda: recorded(1, 2), number=n, repeat=3))
+    print(
+        f"\nmetrics off: {t_checked / n * 1e6:.2f}us, "
+        f"metrics on: {t_recorded / n * 1e6:.2f}us per call")
+    # call metrics are opt-in, the default path does not touch them
+    names = [
+        item["labels"].get("func")
+        for item in metrics.summary().get("oneface_calls_total", [])]
+    assert "bench_add" not in names
+    assert "bench_add_metrics" in names
+    assert t_checked < t_recorded
+
+
+IMPORT_SCRIPT = """
+import sys, time, json
+t0 = time.perf_counter()
+from oneface import one, check_args, Val
+t = time.perf_counter() - t0
+heavy = ["rich", "dash", "flask", "qtpy", "fire", "yaml", "plotly"]
+print(json.dumps({
+    "time": t,
+    "loaded": [m for m in heavy if m in sys.modules],
+}))
+"""
+
+# cold start budget of `from oneface import one`, in seconds
+IMPORT_BUDGET = 0.5
+
+
+def test_import_time():
+    import sys
+    import json
+    import subprocess
+    out = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT])
+    res = json.loads(out)
+    print(f"\nimport time: {res['time'] * 1e3:.1f}ms")
+    # the UI stacks and rich are loaded on first use
+    assert res["loaded"] == []
+    assert res["time"] < IMPORT_BUDGET
@@ -103,6 +103,190 @@ def test_implicit():
     assert func(10, 10) == 20
 
 
+def test_no_format_without_print():
+    n_str = []
+
+    class Data():
+        def __str__(self):
+            n_str.append(1)
+            return "data"
+        __repr__ = __str__
+
+    @check_args(print_args=False)
+    def func(a: Val(Data)):
+        return a
+
+    func(Data())
+    assert len(n_str) == 0
+
+    @check_args(print_args=True)
+    def func2(a: Val(Data), b: Val(list)):
+        return a
+
+    func2(Data(), list(range(10000)))
+    assert len(n_str) == 1
+    assert len(func2.table.columns[3]._cells[1]) <= 60
+
+
+def test_check_plan():
+    @check_args(print_args=False)
+    def func(a: Val[int, [0, 10]], b: str = "b", c=1):
+        return a, b, c
+
+    plan = func.plan
+    assert func(1) == (1, "b", 1)
+    assert func(1, "x", c=2) == (1, "x", 2)
+    assert func.plan is plan
+    assert plan.bind((1,), {}) == {"a": 1, "b": "b", "c": 1}
+    assert plan.bind((), {}) is None
+    assert plan.bind((1,), {"c": 2}) is None
+    assert [n for n, _ in plan.checkers] == ["a", "b"]
+    with pytest.raises(CheckError) as e:
+        func(11, 1)
+    assert isinstance(e.value.args[0][0], ValueError)
+    assert isinstance(e.value.args[0][1], TypeError)
+    with pytest.raises(TypeError):
+        func()
+
+
+def test_result_cache(tmp_path):
+    n_calls = []
+
+    @one(print_args=False, cache=True, cache_size=2)
+    def func(a: Val[int, [0, 10]], b: int = 1):
+        n_calls.append(a)
+        return a + b
+
+    assert func(1) == 2
+    assert func(1, b=1) == 2
+    assert func(a=1) == 2
+    assert len(n_calls) == 1
+    assert func.cache_info()["hits"] == 2
+    assert func.cache_info()["misses"] == 1
+    with pytest.raises(CheckError):
+        func(11)
+    func(2)
+    func(3)
+    assert func.cache_info()["size"] == 2
+    func(1)
+    assert len(n_calls) == 4
+    func.cache_clear()
+    assert func.cache_info()["size"] == 0
+
+    @one(print_args=False, cache=True, cache_dir=str(tmp_path))
+    def func2(a: int):
+        n_calls.append(a)
+        return [a]
+
+    n_calls.clear()
+    assert func2(1) == [1]
+    assert func2(1) == [1]
+    assert len(n_calls) == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    @one(print_args=False)
+    def func3(a: int):
+        return a
+    assert func3.cache_info() is None
+
+
+def test_result_cache_shared_dir(tmp_path):
+    @one(print_args=False, cache=True, cache_dir=str(tmp_path))
+    def f(a: int):
+        return a + 1
+
+    @one(print_args=False, cache=True, cache_dir=str(tmp_path))
+    def g(a: int):
+        return a * 100
+
+    assert f(1) == 2
+    assert g(1) == 100
+    assert f(1) == 2
+    assert g(1) == 100
+    g.cache_clear()
+    assert f.cache_info()["size"] == 1
+
+    # the results of the old version are not reused
+    def make(edited):
+        if edited:
+            def h(a: int):
+                return a - 1
+        else:
+            def h(a: int):
+                return a + 1
+        return one(h, print_args=False, cache=True, cache_dir=str(tmp_path))
+
+    assert make(False)(1) == 2
+    assert make(True)(1) == 0
+
+
+def _square(a: Val[int, [0, 10]]):
+    if a == 5:
+        raise RuntimeError("five")
+    return a * a
+
+
+@pytest.mark.parametrize("workers,backend", [
+    (1, "thread"), (4, "thread"), (2, "process")])
+def test_map(workers, backend):
+    func = one(_square, print_args=False)
+    res = func.map(
+        [{"a": i} for i in range(12)], workers=workers, backend=backend)
+    assert len(res) == 12
+    for i, r in enumerate(res):
+        if i == 5:
+            assert isinstance(r, RuntimeError)
+        elif i > 10:
+            assert isinstance(r, CheckError)
+        else:
+            assert r == i * i
+    res = func.starmap(
+        [(i,) for i in range(3)], workers=workers, backend=backend,
+        stream=True)
+    assert not isinstance(res, list)
+    assert list(res) == [0, 1, 4]
+    res = func.map([{}, {"a": 1.0}])
+    assert isinstance(res[0], TypeError)
+    assert isinstance(res[1], CheckError)
+    # an unknown backend fails before the stream is iterated
+    with pytest.raises(ValueError):
+        func.map([{"a": 1}], backend="bogus", stream=True)
+
+
+def test_pickle_after_call():
+    import pickle
+    func = one(_square, print_args=False, cache=True)
+    assert func(2) == 4
+    func2 = pickle.loads(pickle.dumps(func))
+    assert func2(3) == 9
+    assert func2(2) == 4
+    with pytest.raises(CheckError):
+        func2(11)
+
+
+@one(print_args=False)
+def _add(a: Val[int, [0, 10]], b: int):
+    return a + b
+
+
+def test_map_decorated_process():
+    res = _add.starmap([(1, 2), (3, 4)], workers=2, backend="process")
+    assert res == [3, 7]
+
+
+def test_map_with_cache():
+    n_calls = []
+
+    @one(print_args=False, cache=True)
+    def func(a: int):
+        n_calls.append(a)
+        return a
+
+    assert func.starmap([(1,), (2,)]) == [1, 2]
+    assert func.starmap([(1,), (2,), (3,)]) == [1, 2, 3]
+    assert n_calls == [1, 2, 3]
+
+
 if __name__ == "__main__":
     #test_arg_check()
     #test_arg_register()
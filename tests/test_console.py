@@ -0,0 +1,47 @@
+from oneface.console import ConsoleBuffer
+
+
+def test_read_from_cursor():
+    buf = ConsoleBuffer()
+    buf.write("abc")
+    buf.write("def")
+    assert buf.read_from(0) == ("abcdef", 6, False)
+    assert buf.read_from(4) == ("ef", 6, False)
+    assert buf.read_from(6) == ("", 6, False)
+    buf.write("g")
+    assert buf.read_from(6) == ("g", 7, False)
+    assert buf.getvalue() == "abcdefg"
+
+
+def test_bounded_size():
+    buf = ConsoleBuffer(max_size=5)
+    for c in ["aa", "bb", "cc", "dd"]:
+        buf.write(c)
+    assert buf.getvalue() == "ccdd"
+    assert buf.start == 4
+    text, cursor, truncated = buf.read_from(1)
+    assert text == "ccdd"
+    assert cursor == 8
+    assert truncated
+
+
+def test_thread_capture():
+    import threading
+    from oneface.console import capture_output
+
+    barrier = threading.Barrier(4)
+    buffers = [ConsoleBuffer() for _ in range(4)]
+
+    def work(i):
+        with capture_output(buffers[i]):
+            barrier.wait()
+            for _ in range(100):
+                print(i)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for i, buf in enumerate(buffers):
+        assert buf.getvalue() == f"{i}\n" * 100
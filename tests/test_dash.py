@@ -1,3 +1,5 @@
+import time
+
 from oneface.dash_app import *
 from oneface.core import one
 from oneface.dash_app.embed import flask_route
@@ -89,3 +91,440 @@ def test_on_native_func():
     assert a.mth1.get_dash_app() is not None
     assert a.mth1.input_names == ['name', 'weight']
     assert a.mth1.input_types == [str, float]
+
+
+def test_executor():
+    @app(executor="thread")
+    @one
+    def func(a: int):
+        print(a)
+        return a
+
+    dash_app = func.get_dash_app()
+    ids = [getattr(c, "id", None) for c in dash_app.layout.children]
+    assert "job-id" in ids
+    assert "job-interval" in ids
+    job = func.job_manager.submit(func.func, {"a": 1})
+    job.future.result()
+    assert job.result == 1
+
+
+def call_callback(dash_app, outputs, inputs, state=()):
+    client = dash_app.server.test_client()
+    outputs_ = []
+    for o in outputs:
+        id_, prop = o.split(".")
+        outputs_.append({"id": id_, "property": prop})
+    body = {
+        "output": ".." + "...".join(outputs) + "..",
+        "outputs": outputs_,
+        "inputs": [
+            {"id": i.split(".")[0], "property": i.split(".")[1], "value": v}
+            for i, v in inputs],
+        "state": [
+            {"id": i.split(".")[0], "property": i.split(".")[1], "value": v}
+            for i, v in state],
+        "changedPropIds": [inputs[0][0]],
+    }
+    if len(outputs) == 1:
+        body["output"] = outputs[0]
+        body["outputs"] = outputs_[0]
+    resp = client.post("/_dash-update-component", json=body)
+    return resp
+
+
+def test_session_isolation():
+    @app
+    @one(print_args=False)
+    def func(a: int):
+        print(f"input: {a}")
+        return a
+
+    dash_app = func.get_dash_app()
+    for session_id, val in [("s1", 1), ("s2", 2)]:
+        resp = call_callback(
+            dash_app, ["out.data"],
+            [("run-btn.n_clicks", 1), ("session-id.data", session_id),
+             ("input-a.value", val)])
+        assert resp.status_code == 200
+    assert func.get_session("s1").result == 1
+    assert func.get_session("s2").result == 2
+    assert "input: 2" not in func.get_session("s1").console.getvalue()
+    assert "input: 2" in func.get_session("s2").console.getvalue()
+    assert len(func.sessions) == 2
+
+
+def test_incremental_console():
+    @app(console_max_size=10)
+    @one(print_args=False)
+    def func(a: int):
+        return a
+
+    func.get_dash_app()
+    console = func.get_session("s1").console
+    console.write("hello\n")
+    js, cursor = func.read_console("s1", 0)
+    assert "hello" in js
+    assert cursor == 6
+    assert func.read_console("s1", cursor) == (None, cursor)
+    console.write("world\n")
+    js, cursor = func.read_console("s1", cursor)
+    assert "world" in js and "hello" not in js
+    console.write("a long line\n")
+    js, cursor = func.read_console("s1", 6)
+    assert "truncated" in js
+
+
+def test_sse_transport():
+    @app(transport="sse", executor="thread")
+    @one(print_args=False)
+    def func(a: int):
+        print(f"input: {a}")
+        return a
+
+    dash_app = func.get_dash_app()
+    ids = [getattr(c, "id", None) for c in dash_app.layout.children]
+    assert "console-interval" not in ids
+    assert "job-interval" not in ids
+    resp = call_callback(
+        dash_app, ["job-id.data"],
+        [("run-btn.n_clicks", 1), ("session-id.data", "s1"),
+         ("input-a.value", 1)])
+    assert resp.status_code == 200
+    session = func.get_session("s1")
+    events = func.iter_events("s1")
+    received = ""
+    while "done" not in received:
+        received += next(events)
+    assert "event: console" in received
+    assert "input: 1" in received
+    assert func.fetch_job(session.job_id, "s1")[0] == 1
+
+    client = dash_app.server.test_client()
+    resp = client.get("/_oneface/events/s1", buffered=False)
+    assert resp.mimetype == "text/event-stream"
+    assert b"input: 1" in next(resp.response)
+    resp.close()
+
+
+def test_cancel():
+    from oneface.wrap_cli.wrap import wrap_cli
+    conf = {
+        "name": "test",
+        "command": "python -c 'import time; time.sleep({t})'",
+        "inputs": {"t": {"type": "int"}},
+    }
+    func = app(one(wrap_cli(conf, print_cmd=False)), executor="thread")
+    dash_app = func.get_dash_app()
+    resp = call_callback(
+        dash_app, ["job-id.data", "job-interval.disabled"],
+        [("run-btn.n_clicks", 1), ("session-id.data", "s1"),
+         ("input-t.value", 30)])
+    job_id = resp.get_json()["response"]["job-id"]["data"]
+    job = func.job_manager.get(job_id)
+    time.sleep(0.5)
+    resp = call_callback(
+        dash_app, ["cancel-status.children"],
+        [("cancel-btn.n_clicks", 1)], [("session-id.data", "s1")])
+    assert "cancel requested" in resp.get_data(as_text=True)
+    t0 = time.time()
+    while not job.done:
+        assert time.time() - t0 < 10
+        time.sleep(0.05)
+    assert job.result != 0
+
+
+def test_stream_download(tmp_path):
+    path = tmp_path / "res.bin"
+    path.write_bytes(bytes(range(256)) * 100)
+
+    @app(result_show_type="download", download_mode="stream")
+    @one
+    def func(a: int):
+        return str(path)
+
+    dash_app = func.get_dash_app()
+    client = dash_app.server.test_client()
+    assert client.get("/_oneface/download/s1").status_code == 404
+    call_callback(
+        dash_app, ["out.data"],
+        [("run-btn.n_clicks", 1), ("session-id.data", "s1"),
+         ("input-a.value", 1)])
+    resp = call_callback(
+        dash_app, ["res-download-link.href", "res-download-link.style"],
+        [("out.data", str(path))], [("session-id.data", "s1")])
+    href = resp.get_json()["response"]["res-download-link"]["href"]
+    assert href.startswith("/_oneface/download/s1")
+    resp = client.get(href)
+    assert resp.status_code == 200
+    assert resp.headers["Content-Length"] == "25600"
+    assert resp.data == path.read_bytes()
+    resp = client.get(href, headers={"Range": "bytes=10-19"})
+    assert resp.status_code == 206
+    assert resp.data == bytes(range(10, 20))
+
+
+def test_upload(tmp_path):
+    from funcdesc.types import InputPath
+
+    def read(path: InputPath):
+        with open(path) as f:
+            return f.read()
+
+    # upload is disabled by default
+    dash_app = App(one(read)).get_dash_app()
+    ids = [getattr(c, "id", None) for c in dash_app.layout.children]
+    assert "upload-init" not in ids
+    client = dash_app.server.test_client()
+    assert client.post("/_oneface/upload/s1", data=b"x").status_code != 200
+
+    func = App(
+        one(read), upload=True,
+        upload_dir=str(tmp_path), upload_max_size=1000)
+    dash_app = func.get_dash_app()
+    ids = [getattr(c, "id", None) for c in dash_app.layout.children]
+    assert "upload-init" in ids
+    client = dash_app.server.test_client()
+    resp = client.post(
+        "/_oneface/upload/s1?name=../a b.txt", data=b"hello")
+    assert resp.status_code == 200
+    path = resp.get_json()["path"]
+    assert path.startswith(str(tmp_path / "s1"))
+    assert path.endswith("a_b.txt")
+    resp = call_callback(
+        dash_app, ["out.data"],
+        [("run-btn.n_clicks", 1), ("session-id.data", "s1"),
+         ("input-path.value", path)])
+    assert resp.get_json()["response"]["out"]["data"] == "hello"
+    resp = client.post("/_oneface/upload/s1?name=b", data=b"0" * 2000)
+    assert resp.status_code == 413
+    assert len(list((tmp_path / "s1").iterdir())) == 1
+
+
+def test_server_result_transport():
+    @app(result_transport="server", text_max_chars=100)
+    @one
+    def func(a: int):
+        return "x" * a
+
+    dash_app = func.get_dash_app()
+    resp = call_callback(
+        dash_app, ["out.data"],
+        [("run-btn.n_clicks", 1), ("session-id.data", "s1"),
+         ("input-a.value", 1000)])
+    data = resp.get_json()["response"]["out"]["data"]
+    assert "x" not in str(data)
+    resp = call_callback(
+        dash_app, ["show-text.children"],
+        [("out.data", data)], [("session-id.data", "s1")])
+    text = resp.get_json()["response"]["show-text"]["children"]
+    assert text.startswith("x" * 100)
+    assert "900 of 1000 chars not shown" in text
+
+
+def test_downsample_figure():
+    from oneface.dash_app.result import downsample_figure
+    fig = {"data": [
+        {"type": "scatter", "x": list(range(10000)),
+         "y": list(range(10000))},
+        {"type": "bar", "x": [1, 2], "y": [1, 2]},
+    ]}
+    assert downsample_figure(fig, None) is fig
+    res = downsample_figure(fig, 1000)
+    assert res["data"][0]["type"] == "scattergl"
+    assert len(res["data"][0]["x"]) <= 1000
+    assert res["data"][1] == fig["data"][1]
+    assert len(fig["data"][0]["x"]) == 10000
+
+
+def test_desc_cache():
+    from funcdesc import mark_input
+    from oneface.utils import get_func_desc
+
+    def func(a: int, b: str = "x"):
+        return a
+
+    desc = get_func_desc(func)
+    assert get_func_desc(func) is desc
+    func = mark_input("a", range=[0, 10])(func)
+    desc2 = get_func_desc(func)
+    assert desc2 is not desc
+    assert desc2.inputs[0].range == [0, 10]
+    app1, app2 = App(one(func)), App(one(func))
+    layout1, layout2 = app1.get_layout(), app2.get_layout()
+    assert layout1.children[-1] is not layout2.children[-1]
+    assert app1.input_names == app2.input_names == ["a", "b"]
+
+
+def test_hub():
+    hub = Hub(dash_kwargs={"external_stylesheets": []})
+
+    @hub.route()
+    @one
+    def add(a: int, b: int):
+        return a + b
+
+    hub.add(one(lambda a: a), path="ident")
+    # dispatch through the hub wsgi app
+    from werkzeug.test import Client
+    client = Client(hub)
+    resp = client.get("/")
+    assert "/add/" in resp.get_data(as_text=True)
+    assert "/ident/" in resp.get_data(as_text=True)
+    assert [s["built"] for s in hub.stats()] == [False, False]
+    assert client.get("/add/").status_code == 200
+    assert client.get("/add/_dash-layout").status_code == 200
+    stats = client.get("/_hub/stats").get_json()
+    assert [s["built"] for s in stats] == [True, False]
+    assert stats[0]["build_time"] > 0
+    assert client.get("/ident/").status_code == 200
+    assert client.get("/other/").status_code == 404
+
+
+def test_shared_dir(tmp_path):
+    from oneface.job import check_cancelled
+
+    def func(a: int):
+        print(f"input: {a}")
+        if a < 0:
+            while True:
+                check_cancelled()
+                time.sleep(0.01)
+        return "x" * a
+
+    # two apps share the state, like the worker processes of a server
+    kwargs = dict(
+        executor="thread", result_transport="server",
+        shared_dir=str(tmp_path))
+    app1 = App(one(func, print_args=False), **kwargs)
+    app2 = App(one(func, print_args=False), **kwargs)
+    dash_app1, dash_app2 = app1.get_dash_app(), app2.get_dash_app()
+    resp = call_callback(
+        dash_app1, ["job-id.data", "job-interval.disabled"],
+        [("run-btn.n_clicks", 1), ("session-id.data", "s1"),
+         ("input-a.value", 3)])
+    job_id = resp.get_json()["response"]["job-id"]["data"]
+    t0 = time.time()
+    while True:
+        resp = call_callback(
+            dash_app2,
+            ["out.data", "job-status.children",
+             "job-progress.value", "job-interval.disabled"],
+            [("job-interval.n_intervals", 1)],
+            [("job-id.data", job_id), ("session-id.data", "s1")])
+        res = resp.get_json()["response"]
+        if res["job-interval"]["disabled"]:
+            break
+        assert time.time() - t0 < 10
+        time.sleep(0.05)
+    assert "done" in res["job-status"]["children"]
+    # the finished job is sent once by the events of another app
+    events = app2.iter_events("s1", wait_timeout=0.05, heartbeat=0.05)
+    kinds = [next(events).split("\n")[0] for _ in range(10)]
+    assert kinds.count("event: job") == 1
+    resp = call_callback(
+        dash_app2, ["show-text.children"],
+        [("out.data", res["out"]["data"])], [("session-id.data", "s1")])
+    assert resp.get_json()["response"]["show-text"]["children"] == "xxx"
+    js, _ = app2.read_console("s1", 0)
+    assert "input: 3" in js
+    # cancel the job running in another app
+    resp = call_callback(
+        dash_app1, ["job-id.data", "job-interval.disabled"],
+        [("run-btn.n_clicks", 2), ("session-id.data", "s1"),
+         ("input-a.value", -1)])
+    job = app1.job_manager.get(resp.get_json()["response"]["job-id"]["data"])
+    time.sleep(0.2)
+    assert "cancel requested" in app2.cancel_job("s1")
+    t0 = time.time()
+    while not job.done:
+        assert time.time() - t0 < 10
+        time.sleep(0.05)
+    assert job.status == "cancelled"
+    assert app2.job_manager.get(job.id).status == "cancelled"
+    # download the result file from another app
+    path = tmp_path / "res.txt"
+    path.write_text("result")
+
+    def get_file(a: int):
+        return str(path)
+
+    kwargs = dict(
+        result_show_type="download", download_mode="stream",
+        shared_dir=str(tmp_path / "download"))
+    app1 = App(one(get_file, print_args=False), **kwargs)
+    app2 = App(one(get_file, print_args=False), **kwargs)
+    dash_app1, dash_app2 = app1.get_dash_app(), app2.get_dash_app()
+    call_callback(
+        dash_app1, ["out.data"],
+        [("run-btn.n_clicks", 1), ("session-id.data", "s2"),
+         ("input-a.value", 1)])
+    resp = dash_app2.server.test_client().get("/_oneface/download/s2")
+    assert resp.status_code == 200
+    assert resp.get_data() == b"result"
+
+
+def test_file_console(tmp_path):
+    from oneface.dash_app.shared import FileConsole
+    path = str(tmp_path / "s1.log")
+    console = FileConsole(path, max_size=20)
+    reader = FileConsole(path, max_size=20)
+    console.write("hello\n")
+    assert reader.read_from(0) == ("hello\n", 6, False)
+    for i in range(10):
+        console.write(f"line {i}\n")
+    # the newest output is kept, offsets of the readers are still valid
+    text, cursor, truncated = reader.read_from(6)
+    assert truncated
+    assert text.endswith("line 9\n")
+    assert "line 0" not in text
+    assert cursor == reader.end == 6 + 10 * 7
+    console.write("end\n")
+    assert reader.read_from(cursor) == ("end\n", cursor + 4, False)
+    console.close()
+
+
+def test_serve(monkeypatch):
+    import sys
+    app_module = sys.modules["oneface.dash_app.app"]
+    calls = []
+    monkeypatch.setattr(
+        app_module, "run_gunicorn", lambda *args, **kw: calls.append(args))
+
+    def func(a: int):
+        return a
+
+    func = App(
+        one(func), serve={"server": "gunicorn", "workers": 2}, port=8123)
+    func()
+    wsgi_app, host, port, workers, threads = calls[0]
+    assert wsgi_app is func.dash_app.server
+    assert (host, port, workers, threads) == ("127.0.0.1", 8123, 2, 8)
+    # the state is shared by the worker processes
+    assert func.shared is not None
+    assert func.job_manager.store is func.shared.jobs
+
+
+def test_metrics_route():
+    @app(name="metrics_app")
+    @one(print_args=False)
+    def func(a: int):
+        print(a)
+        return a
+
+    dash_app = func.get_dash_app()
+    call_callback(
+        dash_app, ["out.data"],
+        [("run-btn.n_clicks", 1), ("session-id.data", "s1"),
+         ("input-a.value", 1)])
+    func.read_console("s1", 0)
+    client = dash_app.server.test_client()
+    text = client.get("/_oneface/metrics").get_data(as_text=True)
+    assert "# TYPE oneface_runs_total counter" in text
+    assert 'app="metrics_app"' in text
+    assert "oneface_console_bytes_total" in text
+    summary = client.get("/_oneface/metrics?format=json").get_json()
+    runs = [
+        r for r in summary["oneface_runs_total"]
+        if r["labels"].get("app") == "metrics_app"]
+    assert runs[0]["value"] == 1
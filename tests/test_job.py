@@ -0,0 +1,132 @@
+import time
+from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+
+from oneface.job import JobManager, run_in_process, check_cancelled
+
+import pytest
+
+
+def add(a, b):
+    print("add", a, b)
+    return a + b
+
+
+def raise_error(a):
+    raise ValueError(a)
+
+
+def loop_forever(cooperative):
+    while True:
+        if cooperative:
+            check_cancelled()
+        time.sleep(0.01)
+
+
+def wait_job(job, timeout=10):
+    t0 = time.time()
+    while not job.done:
+        if time.time() - t0 > timeout:
+            raise TimeoutError
+        time.sleep(0.01)
+
+
+def test_sync_run():
+    manager = JobManager()
+    buffer = StringIO()
+    job = manager.submit(add, {"a": 1, "b": 2}, buffer)
+    assert job.status == "done"
+    assert job.result == 3
+    assert "add 1 2" in buffer.getvalue()
+    with pytest.raises(ValueError):
+        manager.submit(raise_error, {"a": 1})
+
+
+@pytest.mark.parametrize("executor", ["thread", "process", "queue"])
+def test_async_run(executor):
+    manager = JobManager(executor, 2)
+    buffer = StringIO()
+    jobs = [manager.submit(add, {"a": i, "b": 1}, buffer) for i in range(3)]
+    for i, job in enumerate(jobs):
+        wait_job(job)
+        assert manager.get(job.id) is job
+        assert job.status == "done"
+        assert job.result == i + 1
+    job = manager.submit(raise_error, {"a": 1}, buffer)
+    wait_job(job)
+    assert job.status == "failed"
+    assert isinstance(job.error, ValueError)
+    manager.shutdown()
+
+
+def test_custom_process_pool():
+    manager = JobManager(ProcessPoolExecutor(1))
+    job = manager.submit(add, {"a": 1, "b": 1})
+    wait_job(job)
+    assert job.result == 2
+    manager.shutdown()
+
+
+def test_run_in_process():
+    buffer = StringIO()
+    import contextlib
+    with contextlib.redirect_stdout(buffer):
+        assert run_in_process(add, {"a": 1, "b": 2}) == 3
+        with pytest.raises(ValueError):
+            run_in_process(raise_error, {"a": 1})
+    assert "add 1 2" in buffer.getvalue()
+    assert "ValueError" in buffer.getvalue()
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_cancel(executor):
+    manager = JobManager(executor, 1)
+    job = manager.submit(loop_forever, {"cooperative": True})
+    pending = manager.submit(add, {"a": 1, "b": 1})
+    time.sleep(0.5)
+    assert job.status == "running"
+    pending.cancel()
+    job.cancel()
+    assert job.status == "cancelled"
+    wait_job(job)
+    assert pending.status == "cancelled"
+    job.future.result(timeout=10)
+    assert job.status == "cancelled"
+    manager.shutdown()
+
+
+@pytest.mark.parametrize("executor", [None, "process"])
+def test_timeout(executor):
+    manager = JobManager(executor, timeout=0.3)
+    t0 = time.time()
+    # the process job is killed, the thread job should be cooperative
+    job = manager.submit(
+        loop_forever, {"cooperative": executor is None})
+    if job.future is not None:
+        job.future.result(timeout=10)
+    assert time.time() - t0 < 10
+    assert job.status == "cancelled"
+    assert "timeout" in repr(job.error)
+    job = manager.submit(add, {"a": 1, "b": 1})
+    if job.future is not None:
+        job.future.result(timeout=10)
+    assert job.status == "done"
+    manager.shutdown()
+
+
+def test_shared_store(tmp_path):
+    from oneface.store import DiskStore
+    manager1 = JobManager("thread", store=DiskStore(str(tmp_path)))
+    manager2 = JobManager("thread", store=DiskStore(str(tmp_path)))
+    job = manager1.submit(add, {"a": 1, "b": 2})
+    wait_job(job)
+    remote = manager2.get(job.id)
+    assert remote.status == "done"
+    assert remote.result == 3
+    job = manager1.submit(loop_forever, {"cooperative": True})
+    time.sleep(0.1)
+    assert manager2.cancel(job.id)
+    wait_job(job)
+    assert job.status == "cancelled"
+    assert not manager2.cancel(job.id)
+    assert manager2.get("not-exist") is None
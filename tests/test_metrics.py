@@ -0,0 +1,78 @@
+import gc
+
+from oneface import one
+from oneface.metrics import Metrics, metrics
+from oneface.job import JobManager
+from funcdesc import Val
+
+import pytest
+
+
+class Queue(object):
+    def depth(self):
+        return 3
+
+
+def get_value(summary, name, **labels):
+    for item in summary.get(name, []):
+        if all(item["labels"].get(k) == v for k, v in labels.items()):
+            return item
+    return None
+
+
+def test_metrics():
+    m = Metrics()
+    m.inc("runs_total", status="done")
+    m.inc("runs_total", 2, status="done")
+    m.observe("run_seconds", 0.02)
+    m.observe("run_seconds", 100)
+    queue = Queue()
+    m.gauge("queue_depth", queue.depth, app='a"b')
+    summary = m.summary()
+    assert summary["runs_total"][0] == {
+        "labels": {"status": "done"}, "value": 3}
+    assert summary["run_seconds"][0]["count"] == 2
+    assert summary["run_seconds"][0]["max"] == 100
+    assert summary["queue_depth"][0]["value"] == 3
+    text = m.to_prometheus()
+    assert "# TYPE runs_total counter" in text
+    assert 'runs_total{status="done"} 3' in text
+    assert 'run_seconds_bucket{le="0.025"} 1' in text
+    assert 'run_seconds_bucket{le="+Inf"} 2' in text
+    assert "run_seconds_count 2" in text
+    assert 'queue_depth{app="a\\"b"} 3' in text
+    # gauges of the collected objects are removed
+    del queue
+    gc.collect()
+    assert "queue_depth" not in m.summary()
+
+
+def test_call_metrics():
+    @one(print_args=False, name="metrics_add", metrics=True)
+    def add(a: Val[int, [0, 10]], b: int):
+        return a + b
+
+    add(1, 2)
+    with pytest.raises(Exception):
+        add(100, 2)
+    summary = metrics.summary()
+    labels = {"func": "metrics_add"}
+    assert get_value(summary, "oneface_calls_total", **labels)["value"] == 2
+    assert get_value(
+        summary, "oneface_check_errors_total", **labels)["value"] == 1
+    assert get_value(summary, "oneface_check_seconds", **labels)["count"] \
+        == 1
+    assert get_value(summary, "oneface_call_seconds", **labels)["count"] \
+        == 1
+
+
+def test_job_metrics():
+    labels = {"interface": "test", "app": "job_metrics"}
+    manager = JobManager(labels=labels)
+    manager.submit(lambda: 1, {})
+    summary = metrics.summary()
+    assert get_value(
+        summary, "oneface_runs_total", status="done", **labels
+    )["value"] == 1
+    assert get_value(summary, "oneface_run_seconds", **labels)["count"] == 1
+    assert get_value(summary, "oneface_queue_depth", **labels)["value"] == 0
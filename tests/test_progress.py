@@ -0,0 +1,61 @@
+import time
+
+from oneface import progress, report
+from oneface.progress_report import ProgressState
+from oneface.job import JobManager
+
+
+class CountRender(ProgressState):
+    def __init__(self, min_interval=0.1):
+        super().__init__(min_interval)
+        self.n_render = 0
+
+    def render(self):
+        self.n_render += 1
+
+
+def work(n):
+    s = 0
+    for i in progress(range(n), message="working"):
+        s += i
+    report(1.0, "finished")
+    return s
+
+
+def test_no_reporter():
+    assert list(progress(range(3))) == [0, 1, 2]
+    report(0.5)
+
+
+def test_progress():
+    state = CountRender(min_interval=10)
+    with state.activate():
+        assert work(1000) == sum(range(1000))
+    assert state.n == 1000
+    assert state.total == 1000
+    assert state.fraction == 1.0
+    assert state.message == "finished"
+    # rate-limited, rendered at start and close
+    assert state.n_render == 2
+    assert "100%" in state.text()
+
+
+def test_job_progress():
+    manager = JobManager("process")
+    job = manager.submit(work, {"n": 100})
+    job.future.result(timeout=10)
+    assert job.result == sum(range(100))
+    assert job.progress.fraction == 1.0
+    assert job.progress.message == "finished"
+    manager.shutdown()
+
+
+def test_rate():
+    state = ProgressState()
+    with state.activate():
+        report(n=0, total=10)
+        time.sleep(0.05)
+        report(n=5)
+    assert state.fraction == 0.5
+    assert state.rate > 0
+    assert state.eta > 0
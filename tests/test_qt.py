@@ -137,5 +137,106 @@ def test_on_native_func():
     assert isinstance(a.mth1, GUI)
 
 
+def test_timeout():
+    import time
+    from oneface import check_cancelled
+
+    @gui(timeout=0.2)
+    @one
+    def func(a: Val(int, [0, 10])):
+        while True:
+            check_cancelled()
+            time.sleep(0.01)
+
+    t0 = time.time()
+    func.run_func()
+    assert time.time() - t0 < 5
+    assert func.result is None
+
+
+def test_thread_pool():
+    import time
+    from oneface import check_cancelled
+
+    @gui(run_once=False, max_workers=2)
+    @one
+    def func(a: Val(int, [0, 10])):
+        if a == 0:
+            while True:
+                check_cancelled()
+                time.sleep(0.01)
+        return a
+
+    for i in range(1, 4):
+        func.arg_widgets['a'].input.setValue(i)
+        func.run_func()
+    assert func.wait(5000)
+    assert [w.status for w in func.runs] == ["done"] * 3
+    assert sorted(w.result for w in func.runs) == [1, 2, 3]
+    assert func.run_list.count() == 3
+    assert "#1 done" in func.run_list.item(0).text()
+    func.arg_widgets['a'].input.setValue(0)
+    for _ in range(3):
+        func.run_func()
+    time.sleep(0.2)
+    func.cancel_func()
+    assert func.wait(5000)
+    assert [w.status for w in func.runs[3:]] == ["cancelled"] * 3
+
+
+def test_process_backend():
+    import os
+
+    @gui(run_once=False, backend="process")
+    @one
+    def func(a: Val(int, [0, 10])):
+        print("pid", os.getpid())
+        return a * 2
+
+    func.arg_widgets['a'].input.setValue(2)
+    func.run_func()
+    assert func.wait(10000)
+    assert func.result == 4
+    text = func.terminal.toPlainText()
+    assert "pid" in text
+    assert f"pid {os.getpid()}" not in text
+
+
+def test_terminal():
+    @gui(run_once=False, terminal_max_lines=100)
+    @one
+    def func(a: Val(int, [0, 10])):
+        for i in range(20000):
+            print("line", i)
+        return a
+
+    func.run_func()
+    assert func.wait(10000)
+    assert func.terminal.isReadOnly()
+    assert func.terminal.blockCount() <= 100
+    text = func.terminal.toPlainText()
+    assert "line 19999" in text
+    assert "line 100\n" not in text
+
+
+def test_metrics():
+    import json
+
+    @gui(run_once=False, name="qt_metrics")
+    @one(print_args=False)
+    def func(a: Val(int, [0, 10])):
+        return a
+
+    func.run_func()
+    assert func.wait(10000)
+    assert func.queue_depth() == 0
+    summary = json.loads(func.metrics_text())
+    runs = [
+        r for r in summary["oneface_runs_total"]
+        if r["labels"].get("app") == "qt_metrics"]
+    assert runs[0]["labels"]["interface"] == "qt"
+    assert runs[0]["value"] == 1
+
+
 if __name__ == "__main__":
     test_set_text()
@@ -0,0 +1,68 @@
+import time
+
+from oneface.store import TTLStore
+
+
+def test_lru_evict():
+    store = TTLStore(max_size=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    assert store.get("a") == 1
+    store.set("c", 3)
+    assert "b" not in store
+    assert store.get("a") == 1
+    assert store.get("c") == 3
+    assert len(store) == 2
+    assert store.pop("a") == 1
+    assert "a" not in store
+
+
+def test_ttl_evict():
+    store = TTLStore(max_size=10, ttl=0.05)
+    store.set("a", None)
+    assert "a" in store
+    time.sleep(0.1)
+    assert "a" not in store
+    store.set("b", 1)
+    time.sleep(0.1)
+    store.set("c", 2)
+    assert len(store) == 1
+
+
+def test_setdefault():
+    store = TTLStore()
+    val = store.setdefault("a", list)
+    assert store.setdefault("a", list) is val
+
+
+def test_disk_store(tmp_path):
+    from oneface.store import DiskStore
+    store = DiskStore(str(tmp_path), max_size=2)
+    store.set("a", [1])
+    assert store.get("a") == [1]
+    assert store.get("b") is None
+    time.sleep(0.01)
+    store.set("b", 2)
+    time.sleep(0.01)
+    store.set("c", 3)
+    assert len(store) == 2
+    assert "a" not in store
+    assert store.pop("b") == 2
+    assert "b" not in store
+    store.clear()
+    assert len(store) == 0
+
+
+def test_disk_store_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from oneface.store import DiskStore
+    store = DiskStore(str(tmp_path), max_size=5)
+
+    def set_items(i):
+        for j in range(100):
+            store.set((i, j), j)
+
+    with ThreadPoolExecutor(8) as pool:
+        # the files evicted by other threads do not break the eviction
+        list(pool.map(set_items, range(8)))
+    assert len(store) <= 5
@@ -2,7 +2,9 @@ import contextlib
 from io import StringIO
 import os.path as osp
 import sys
+import time
 
+from oneface.core import one
 from oneface.wrap_cli.wrap import wrap_cli, load_config
 
 
@@ -79,3 +81,149 @@ def test_stdout_block():
     console_buffer = StringIO()
     with contextlib.redirect_stderr(console_buffer):
         assert 0 == wrap(True)
+
+
+def test_path_types(tmp_path):
+    from funcdesc.types import InputPath, OutputPath
+    from oneface.core import one
+    conf = {
+        "name": "copy",
+        "command": "cp {src} {dst}",
+        "inputs": {
+            "src": {"type": "InputPath"},
+            "dst": {"type": "OutputPath"},
+        },
+    }
+    wrap = wrap_cli(conf, print_cmd=False)
+    of = one(wrap, print_args=False)
+    assert [a.type for a in of.desc.inputs] == [InputPath, OutputPath]
+    src = tmp_path / "a.txt"
+    src.write_text("a")
+    assert 0 == of(str(src), str(tmp_path / "b.txt"))
+    assert (tmp_path / "b.txt").read_text() == "a"
+
+
+def test_cache(tmp_path):
+    src = tmp_path / "in.txt"
+    src.write_text("hello")
+    dst = tmp_path / "out.txt"
+    conf = {
+        "name": "test",
+        "command": "python -c 'print(open(\"{src}\").read()); "
+                   "open(\"{dst}\", \"w\").write(\"{tag}\")'",
+        "inputs": {
+            "src": {"type": "InputPath"},
+            "dst": {"type": "OutputPath"},
+            "tag": {"type": "str"},
+        },
+        "cache": {"dir": str(tmp_path / "cache")},
+    }
+    wrap = wrap_cli(conf, print_cmd=False)
+    buf = StringIO()
+    wrap.out_stream = buf
+    assert 0 == wrap(str(src), str(dst), "1")
+    assert wrap.misses == 1
+    dst.unlink()
+    assert 0 == wrap(str(src), str(dst), "1")
+    assert wrap.hits == 1
+    assert dst.read_text() == "1"
+    assert buf.getvalue() == "hello\nhello\n"
+    assert 0 == wrap(str(src), str(dst), "2")
+    assert wrap.misses == 2
+    time.sleep(0.01)
+    src.write_text("world")
+    assert 0 == wrap(str(src), str(dst), "2")
+    assert wrap.misses == 3
+    assert buf.getvalue().endswith("world\n")
+
+
+def test_cache_with_one(tmp_path):
+    conf = {
+        "name": "test",
+        "command": "python -c 'print({a})'",
+        "inputs": {"a": {"type": "int"}},
+        "cache": {"dir": str(tmp_path / "cache")},
+    }
+    wrap = wrap_cli(conf, print_cmd=False)
+    buf = StringIO()
+    wrap.out_stream = buf
+    func = one(wrap, print_args=False)
+    assert 0 == func(1)
+    assert 0 == func(1)
+    assert (wrap.hits, wrap.misses) == (1, 1)
+    assert buf.getvalue() == "1\n1\n"
+
+
+def test_sweep(tmp_path):
+    from oneface.wrap_cli.sweep import Sweep, load_arg_sets, load_summary
+    grid = tmp_path / "grid.yaml"
+    grid.write_text("a: [1, 20]\nb: [0, 1]\n")
+    arg_sets = load_arg_sets(str(grid))
+    assert len(arg_sets) == 4
+    conf = load_config(example_yaml)
+    out_dir = tmp_path / "out"
+    records = Sweep(conf, arg_sets, str(out_dir), max_parallel=2).run()
+    assert [r['retcode'] for r in records] == [0, 0, -1, -1]
+    assert "CheckError" in records[2]['error']
+    assert (out_dir / "run-0001.log").read_text().strip() == "2"
+    records = Sweep(conf, arg_sets, str(out_dir), max_parallel=2).run()
+    assert len(records) == 2
+    assert len(load_summary(str(out_dir / "summary.jsonl"))) == 4
+    # errors of a run are recorded, the other runs go on
+    conf = {
+        "name": "test",
+        "command": "{exe} -c 'print(1)'",
+        "inputs": {"exe": {"type": "str"}},
+    }
+    out_dir = tmp_path / "out2"
+    arg_sets = [{"exe": "/not/exist/python"}, {"exe": sys.executable}]
+    records = Sweep(conf, arg_sets, str(out_dir), max_parallel=2).run()
+    assert [r['retcode'] for r in records] == [-1, 0]
+    assert "FileNotFoundError" in records[0]['error']
+    assert len(load_summary(str(out_dir / "summary.jsonl"))) == 2
+
+
+def test_stream_output():
+    from oneface.console import ConsoleBuffer, capture_output
+    conf = {
+        "name": "test",
+        "command": "python -c 'print(\"a\" * {n}); print(\"b\")'",
+        "inputs": {"n": {"type": "int"}},
+        "max_output": 50,
+    }
+    wrap = wrap_cli(conf, print_cmd=False)
+    buffer = ConsoleBuffer()
+    with capture_output(buffer):
+        assert 0 == wrap(10)
+    assert buffer.getvalue() == "a" * 10 + "\nb\n"
+    buffer = ConsoleBuffer()
+    with capture_output(buffer):
+        assert 0 == wrap(100)
+    assert "exceeds 50 characters" in buffer.getvalue()
+    assert "aaa" not in buffer.getvalue()
+
+
+def test_kill():
+    import threading
+    from oneface.job import CancelToken
+    conf = {
+        "name": "test",
+        "command": "python -c 'import time; time.sleep({t})'",
+        "inputs": {"t": {"type": "int"}},
+    }
+    wrap = wrap_cli(conf, print_cmd=False)
+    token = CancelToken()
+    res = []
+
+    def run():
+        with token.activate():
+            res.append(wrap(30))
+
+    t0 = time.time()
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.5)
+    token.cancel()
+    thread.join(10)
+    assert time.time() - t0 < 10
+    assert res[0] != 0